@@ -27,10 +27,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "MiniStore.middleware.PrecompressedStaticMiddleware",
+    "MiniStore.metrics.MetricsMiddleware",
+    "MiniStore.pagecache.PageCacheMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "MiniStore.profiling.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -39,7 +43,8 @@ ROOT_URLCONF = "ECommerceProject.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Django's backend, timing renders for /metrics (MiniStore/metrics.py)
+        "BACKEND": "MiniStore.metrics.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "MiniStore" / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -64,6 +69,24 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Keep connections between requests (pragmas run once per connection, see
+        # MiniStore/database.py) and check them before reuse
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        # Seconds Python's sqlite3 waits for a lock (busy_timeout is set too)
+        "OPTIONS": {"timeout": 5},
+    }
+}
+
+
+# Cache – shared by every worker process (catalog version, product card fragments, anonymous
+# pages and their purge tags), so a change made in one process is seen by all of them.
+# Files need no extra service; Redis (django.core.cache.backends.redis.RedisCache) works too.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+        "OPTIONS": {"MAX_ENTRIES": 20000},
     }
 }
 
@@ -96,6 +119,13 @@ STATIC_URL = "/static/"
 STATICFILES_DIRS = [BASE_DIR / "MiniStore" / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# collectstatic minifies CSS/JS, writes content-hashed names + a manifest and
+# .gz/.br siblings (MiniStore/storage.py); PrecompressedStaticMiddleware serves them
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "MiniStore.storage.CompressedManifestStaticFilesStorage"},
+}
+
 # Media Config (Images)
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
@@ -106,4 +136,28 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
 LOGIN_URL = "/account/login/"
-LOGOUT_URL = "/account/logout/"
\ No newline at end of file
+LOGOUT_URL = "/account/logout/"
+
+# Cart storage for logged-in users: "database" (saved Cart/CartItem rows) or "session"
+CART_BACKEND = "database"
+
+# Background tasks: queued in the Task table and run by `python manage.py runworker`.
+# True runs them inline instead (handy for tests or when no worker is running).
+TASKS_EAGER = False
+
+# Whole-page cache for visitors without cookies (MiniStore/pagecache.py), in seconds; 0 turns it off
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Catalog listings: "keyset" (cursor pages, no COUNT/OFFSET) or "offset" (numbered pages)
+CATALOG_PAGINATION = "keyset"
+
+# Request metrics at /metrics (MiniStore/metrics.py), readable by staff or with this bearer token
+METRICS_TOKEN = None
+# With several worker processes, a SQLite file they all add their metrics to (None: per process)
+METRICS_SPOOL = None
+
+# Sampling profiler (MiniStore/profiling.py): staff add "X-Profile: 1" or ?_profile=1 to a request;
+# PROFILE_SAMPLE_RATE profiles that share of all requests as well. Newest PROFILE_KEEP kept in PROFILE_DIR.
+PROFILE_SAMPLE_RATE = 0
+PROFILE_DIR = BASE_DIR / "profiles"
+PROFILE_KEEP = 50
\ No newline at end of file
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Category, Order, OrderItem, Product, UserProfile
+from .models import Category, Order, OrderItem, Product, Task, UserProfile
 
 
 class OrderItemInline(admin.TabularInline):
@@ -10,10 +10,16 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ["id", "user", "first_name", "last_name", "paid", "created"]
+    list_display = ["id", "user", "first_name", "last_name", "total", "item_count", "paid", "created"]
     list_filter = ["paid", "created", "updated"]
+    readonly_fields = ["total", "item_count"]
     inlines = [OrderItemInline]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Items may have been edited inline; keep the stored totals honest
+        form.instance.update_totals()
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -33,3 +39,10 @@ class ProductAdmin(admin.ModelAdmin):
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ["user", "role"]
     list_filter = ["role"]
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ["id", "name", "status", "attempts", "run_at", "locked_by", "updated"]
+    list_filter = ["status", "name"]
+    readonly_fields = ["created", "updated"]
@@ -0,0 +1,133 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import (
+    Case, Count, DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+
+from .models import Order, OrderItem, Product, UserProfile
+
+# ---------------------------------------------------------
+#                   SELLER ANALYTICS
+# ---------------------------------------------------------
+
+
+def seller_stats(seller, start=None, end=None):
+    """
+    Product count, order count, units sold and revenue for one seller.
+
+    One aggregate query over the seller's products LEFT JOINed to their order
+    items. ``start``/``end`` (datetimes, end exclusive) limit the sales figures
+    to orders placed in that window; the product count is always all products.
+    """
+    sales = Q(order_items__isnull=False)
+    if start is not None:
+        sales &= Q(order_items__order__created__gte=start)
+    if end is not None:
+        sales &= Q(order_items__order__created__lt=end)
+
+    money = DecimalField(max_digits=14, decimal_places=2)
+    return Product.objects.filter(created_by=seller).aggregate(
+        products=Count("id", distinct=True),
+        orders=Count("order_items__order", distinct=True, filter=sales),
+        units=Coalesce(Sum("order_items__quantity", filter=sales), 0),
+        revenue=Coalesce(
+            Sum(F("order_items__price") * F("order_items__quantity"), filter=sales, output_field=money),
+            0,
+            output_field=money,
+        ),
+    )
+
+
+# Newest sale first; ``id`` breaks ties between lines of the same order
+LEDGER_ORDERING = ("-order_created", "-id")
+
+
+def seller_sales_ledger(seller, start=None, end=None, product=None):
+    """
+    The seller's order lines, newest first, for KeysetPaginator.
+
+    Each row has ``order`` and ``product`` joined in, plus ``order_created``
+    (the sort key) and ``line_total`` computed by the database. Filter by
+    order date (``start``/``end``, end exclusive) and optionally one product.
+    """
+    lines = OrderItem.objects.filter(product__created_by=seller)
+    if start is not None:
+        lines = lines.filter(order__created__gte=start)
+    if end is not None:
+        lines = lines.filter(order__created__lt=end)
+    if product is not None:
+        lines = lines.filter(product=product)
+
+    return lines.select_related("order", "product").annotate(
+        order_created=F("order__created"),
+        line_total=ExpressionWrapper(F("price") * F("quantity"), output_field=DecimalField(max_digits=14, decimal_places=2)),
+    )
+
+
+# ---------------------------------------------------------
+#                   ADMIN DASHBOARD
+# ---------------------------------------------------------
+
+
+def store_totals():
+    """
+    Product, order, seller and customer totals in a single round trip.
+
+    The four counts live in different tables, so they are issued as scalar
+    subqueries of one SELECT instead of four COUNT(*) queries.
+    """
+    counted = {
+        "total_products": Product.objects.all(),
+        "total_orders": Order.objects.all(),
+        "total_sellers": UserProfile.objects.filter(role="SELLER"),
+        "total_customers": UserProfile.objects.filter(role="CUSTOMER"),
+    }
+    columns, params = [], []
+    for queryset in counted.values():
+        sql, sql_params = queryset.order_by().values("pk").query.sql_with_params()
+        columns.append(f"(SELECT COUNT(*) FROM ({sql}) counted)")
+        params.extend(sql_params)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(columns)}", params)
+        row = cursor.fetchone()
+    return dict(zip(counted, row))
+
+
+# Users needing an admin decision first, then sellers, then everyone else
+PRIORITY_CANCELLATION, PRIORITY_PENDING, PRIORITY_SELLER, PRIORITY_OTHER = range(4)
+
+USER_FILTERS = {
+    "all": Q(),
+    "pending": Q(profile__seller_status__in=["PENDING", "CANCELLATION_REQUESTED"]),
+    "sellers": Q(profile__role="SELLER"),
+    "customers": Q(profile__role="CUSTOMER"),
+}
+
+
+def user_directory(show="all"):
+    """
+    Non-superusers for the admin table, for KeysetPaginator(ordering=("priority", "id")).
+
+    ``priority`` is computed by the database, and each user's order count is a
+    correlated subquery, so only the rows of the requested page are counted.
+    """
+    order_count = (
+        Order.objects.filter(user=OuterRef("pk")).order_by().values("user").annotate(n=Count("id")).values("n")
+    )
+    return (
+        User.objects.exclude(is_superuser=True)
+        .filter(USER_FILTERS.get(show, Q()))
+        .select_related("profile")
+        .annotate(
+            priority=Case(
+                When(profile__seller_status="CANCELLATION_REQUESTED", then=Value(PRIORITY_CANCELLATION)),
+                When(profile__seller_status="PENDING", then=Value(PRIORITY_PENDING)),
+                When(profile__role="SELLER", then=Value(PRIORITY_SELLER)),
+                default=Value(PRIORITY_OTHER),
+                output_field=IntegerField(),
+            ),
+            total_order_count=Coalesce(Subquery(order_count, output_field=IntegerField()), 0),
+        )
+    )
@@ -0,0 +1,246 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CartItem, Product
+from .models import Cart as SavedCart
+
+CART_SESSION_KEY = "cart"
+
+# ---------------------------------------------------------
+#                   CART STORAGE
+# ---------------------------------------------------------
+# Two interchangeable stores hold {product_id: quantity}:
+#   * SessionCartStore  - the original nested dict in the session
+#   * DatabaseCartStore - one CartItem row per line; every change is a
+#                         single-row UPDATE/INSERT, the session is untouched
+# CART_BACKEND = "database" uses the DB store for logged-in users; anonymous
+# visitors always get the session store.
+
+
+class SessionCartStore:
+    def __init__(self, session):
+        self.session = session
+        self.data = session.get(CART_SESSION_KEY) or {}
+
+    def _save(self):
+        # Only touch the session on writes, so merely reading an empty cart
+        # never creates a session for an anonymous visitor
+        self.session[CART_SESSION_KEY] = self.data
+        self.session.modified = True
+
+    def quantities(self):
+        return {pid: item["quantity"] for pid, item in self.data.items()}
+
+    def quantity(self, product_id):
+        item = self.data.get(str(product_id))
+        return item["quantity"] if item else 0
+
+    def __contains__(self, product_id):
+        return str(product_id) in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def count(self):
+        return sum(item["quantity"] for item in self.data.values())
+
+    def add(self, product_id, quantity):
+        pid = str(product_id)
+        if pid in self.data:
+            self.data[pid]["quantity"] += quantity
+        else:
+            self.data[pid] = {"quantity": quantity}
+        self._save()
+
+    def set(self, product_id, quantity):
+        self.data[str(product_id)] = {"quantity": quantity}
+        self._save()
+
+    def remove(self, *product_ids):
+        for pid in product_ids:
+            self.data.pop(str(pid), None)
+        self._save()
+
+    def clear(self):
+        self.data.clear()
+        self._save()
+
+
+class DatabaseCartStore:
+    def __init__(self, user):
+        self.user = user
+        self._quantities = None
+
+    def _items(self):
+        return CartItem.objects.filter(cart__user=self.user)
+
+    def quantities(self):
+        if self._quantities is None:
+            self._quantities = {
+                str(pid): qty for pid, qty in self._items().values_list("product_id", "quantity")
+            }
+        return self._quantities
+
+    def quantity(self, product_id):
+        return self.quantities().get(str(product_id), 0)
+
+    def __contains__(self, product_id):
+        return str(product_id) in self.quantities()
+
+    def __len__(self):
+        return len(self.quantities())
+
+    def count(self):
+        return sum(self.quantities().values())
+
+    def _cart_id(self):
+        cart, _ = SavedCart.objects.get_or_create(user=self.user)
+        return cart.id
+
+    def add(self, product_id, quantity):
+        now = timezone.now()
+        items = self._items().filter(product_id=product_id)
+        if not items.update(quantity=F("quantity") + quantity, updated=now):
+            try:
+                with transaction.atomic():
+                    CartItem.objects.create(cart_id=self._cart_id(), product_id=product_id, quantity=quantity)
+            except IntegrityError:
+                # Another request inserted the row first
+                items.update(quantity=F("quantity") + quantity, updated=now)
+        self._quantities = None
+
+    def set(self, product_id, quantity):
+        if not self._items().filter(product_id=product_id).update(quantity=quantity, updated=timezone.now()):
+            CartItem.objects.bulk_create(
+                [CartItem(cart_id=self._cart_id(), product_id=product_id, quantity=quantity)],
+                update_conflicts=True,
+                unique_fields=["cart", "product"],
+                update_fields=["quantity", "updated"],
+            )
+        if self._quantities is not None:
+            self._quantities[str(product_id)] = quantity
+
+    def remove(self, *product_ids):
+        self._items().filter(product_id__in=product_ids).delete()
+        if self._quantities is not None:
+            for pid in product_ids:
+                self._quantities.pop(str(pid), None)
+
+    def clear(self):
+        self._items().delete()
+        self._quantities = {}
+
+
+def get_cart_store(request):
+    """The cart store for this request (memoized on the request)."""
+    store = getattr(request, "_cart_store", None)
+    if store is None:
+        user = getattr(request, "user", None)
+        if getattr(settings, "CART_BACKEND", "session") == "database" and user is not None and user.is_authenticated:
+            store = DatabaseCartStore(user)
+        else:
+            store = SessionCartStore(request.session)
+        request._cart_store = store
+    return store
+
+
+def merge_session_cart(request, user):
+    """On login, move the anonymous session cart into the user's saved cart."""
+    session_cart = request.session.get(CART_SESSION_KEY)
+    if not session_cart:
+        return
+    store = DatabaseCartStore(user)
+    existing = set(Product.objects.filter(id__in=session_cart.keys()).values_list("id", flat=True))
+    for pid, item in session_cart.items():
+        if int(pid) in existing:
+            store.add(pid, item["quantity"])
+    del request.session[CART_SESSION_KEY]
+    request._cart_store = store
+
+
+# ---------------------------------------------------------
+#                   CART PRICING
+# ---------------------------------------------------------
+# One place that turns the {product_id: quantity} cart into priced
+# lines. Everything is fetched with a single id__in query, so pricing a cart
+# costs the same whether it holds one item or fifty.
+
+
+class CartLine:
+    def __init__(self, product, quantity):
+        self.product = product
+        self.quantity = quantity
+
+    @property
+    def price(self):
+        return self.product.price
+
+    @property
+    def item_total(self):
+        return self.product.price * self.quantity
+
+
+class CartSummary:
+    """
+    Result of pricing a cart.
+
+    ``lines`` are the purchasable items (in product ordering), ``unavailable``
+    lines whose product was switched off, and ``stale_ids`` cart keys whose
+    product no longer exists. Only ``lines`` count towards total/count.
+    """
+
+    def __init__(self, lines, unavailable, stale_ids):
+        self.lines = lines
+        self.unavailable = unavailable
+        self.stale_ids = stale_ids
+        self._by_id = {str(line.product.id): line for line in lines}
+
+    # Worked out on access, so a line's quantity can still change after pricing
+    @property
+    def total(self):
+        return sum((line.item_total for line in self.lines), Decimal("0"))
+
+    @property
+    def count(self):
+        return sum(line.quantity for line in self.lines)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def line(self, product_id):
+        return self._by_id.get(str(product_id))
+
+
+class Cart:
+    """Prices the contents of a cart store (see get_cart_store)."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def price(self, product_ids=None):
+        """Price the whole cart, or only ``product_ids`` (e.g. a checkout selection)."""
+        quantities = self.store.quantities()
+        if product_ids is None:
+            keys = list(quantities.keys())
+        else:
+            keys = [str(pid) for pid in product_ids if str(pid) in quantities]
+
+        products = Product.objects.filter(id__in=keys).select_related("category")
+
+        lines, unavailable = [], []
+        found = set()
+        for product in products:
+            pid = str(product.id)
+            found.add(pid)
+            line = CartLine(product, quantities[pid])
+            (lines if product.available else unavailable).append(line)
+
+        stale_ids = [key for key in keys if key not in found]
+        return CartSummary(lines, unavailable, stale_ids)
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Category
+
+# ---------------------------------------------------------
+#                   CATALOG METADATA CACHE
+# ---------------------------------------------------------
+# The category list (with the number of available products in each) changes
+# rarely but is needed on every catalog page. It is kept in process memory and
+# tagged with a version number stored in the Django cache; Category/Product
+# signals bump that version once the change is committed, and the next reader
+# reloads everything in one query. The cache is shared by all worker processes
+# (settings.CACHES), so a bump made in one reaches every process's copy.
+
+VERSION_KEY = "catalog:version"
+CHANGED_AT_KEY = "catalog:changed_at"
+
+_lock = threading.Lock()
+_state = {"version": None, "categories": [], "by_slug": {}}
+
+
+def catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # First use (or the cache was cleared): start from the clock, so no process's copy matches
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def catalog_changed_at():
+    """When the catalog version was last bumped (if the cache forgot, assume just now)."""
+    changed_at = cache.get(CHANGED_AT_KEY)
+    if changed_at is None:
+        cache.add(CHANGED_AT_KEY, timezone.now(), None)
+        changed_at = cache.get(CHANGED_AT_KEY)
+    return changed_at
+
+
+def bump_catalog_version():
+    cache.set(CHANGED_AT_KEY, timezone.now(), None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _load():
+    categories = list(
+        Category.objects.annotate(
+            available_count=Count("products", filter=Q(products__available=True))
+        )
+    )
+    return categories, {category.slug: category for category in categories}
+
+
+def _current():
+    version = catalog_version()
+    if _state["version"] != version:
+        with _lock:
+            if _state["version"] != version:
+                categories, by_slug = _load()
+                _state.update(version=version, categories=categories, by_slug=by_slug)
+    return _state
+
+
+def get_categories():
+    """All categories (Meta ordering), each annotated with ``available_count``."""
+    return _current()["categories"]
+
+
+def get_category(slug):
+    """Cached Category for a slug, or None."""
+    return _current()["by_slug"].get(slug)
+
+
+def category_counts():
+    """{category_id: number of available products}"""
+    return {category.id: category.available_count for category in get_categories()}
@@ -0,0 +1,131 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control
+
+from .cart import get_cart_store
+from .catalog import catalog_changed_at, catalog_version, get_category
+from .models import Product, UserProfile
+from .notifications import unread_count
+
+# ---------------------------------------------------------
+#                   CONDITIONAL GET
+# ---------------------------------------------------------
+# Catalog pages get an ETag built from everything they show: the product row
+# (updated timestamp, stock) on detail pages, the catalog version, the query
+# string and, because the navbar is part of the page, the visitor's cart and
+# notification badge. The ETag functions run a couple of tiny queries *before*
+# the view, so a browser revalidating an unchanged page gets "304 Not
+# Modified" without the template ever being rendered.
+#
+# Listings show no stock, and everything else on them (product saves and
+# deletes, category changes, products selling out) bumps the cached catalog
+# version, so that stamp stands in for the product rows: no query over the
+# catalog runs before the view.
+#
+# The ETags are weak (W/"..."): the CSRF token in the markup is re-masked on
+# every render, so bodies are equivalent rather than byte-identical.
+#
+# Last-Modified is only sent for anonymous visitors with an empty cart, where
+# the product timestamps really are the whole story.
+
+
+@lru_cache(maxsize=1)
+def _template_version():
+    """Changes when any template file does, so a deploy never revalidates stale markup."""
+    dirs = [Path(d) for engine in settings.TEMPLATES for d in engine.get("DIRS", [])]
+    dirs.append(Path(__file__).resolve().parent / "templates")
+    mtimes = [f.stat().st_mtime_ns for d in dirs if d.is_dir() for f in d.rglob("*.html")]
+    return str(max(mtimes, default=0))
+
+
+def _visitor_state(request):
+    """Per-visitor parts of the page, or None if the page must not be revalidated at all."""
+    if len(get_messages(request)):
+        # Flash messages are shown once; a 304 would swallow them
+        return None
+
+    cart = sorted(get_cart_store(request).quantities().items())
+    user = request.user
+    if not user.is_authenticated:
+        return ["anon", cart]
+
+    # unread_count() loads user.profile, which the navbar reuses; memoized like the context processor
+    request._notif_count = unread_count(user)
+    try:
+        role, status = user.profile.role, user.profile.seller_status
+    except UserProfile.DoesNotExist:
+        role = status = ""
+    return [user.pk, user.username, user.is_superuser, role, status, request._notif_count, cart]
+
+
+def _is_generic(request):
+    """True when the page holds nothing specific to this visitor (Last-Modified is safe)."""
+    return not request.user.is_authenticated and not get_cart_store(request).quantities()
+
+
+def _weak_etag(*parts):
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+# --- product detail ---
+
+def _product_row(request, slug):
+    row = getattr(request, "_product_validator", None)
+    if row is None:
+        row = (
+            Product.objects.filter(slug=slug, available=True)
+            .values_list("id", "updated", "stock")
+            .first()
+        )
+        request._product_validator = row or ()
+    return row or None
+
+
+def product_etag(request, slug):
+    row = _product_row(request, slug)
+    visitor = _visitor_state(request)
+    if row is None or visitor is None:
+        return None  # let the view 404 / render normally
+    return _weak_etag("product", row, catalog_version(), _template_version(), visitor)
+
+
+def product_last_modified(request, slug):
+    row = _product_row(request, slug)
+    if row is None or not _is_generic(request):
+        return None
+    return max(row[1], catalog_changed_at())
+
+
+# --- catalog listings (home, shop, category pages) ---
+
+def catalog_queryset(category=None):
+    products = Product.objects.filter(available=True)
+    return products.filter(category=category) if category else products
+
+
+def listing_etag(request, category_slug=None):
+    category = None
+    if category_slug:
+        category = get_category(category_slug)
+        if category is None:
+            return None
+    visitor = _visitor_state(request)
+    if visitor is None:
+        return None
+    return _weak_etag(
+        "listing", request.path, request.GET.urlencode(), catalog_version(), _template_version(), visitor,
+    )
+
+
+def revalidate(response, request):
+    """Cache-Control for pages served with these validators: always revalidate."""
+    if request.user.is_authenticated:
+        patch_cache_control(response, no_cache=True, private=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
@@ -1,14 +1,17 @@
 
-from .models import Notification 
+from .notifications import unread_count
+from .cart import get_cart_store
 
 def cart_count(request):
-    cart = request.session.get('cart', {})
-    count = sum(item['quantity'] for item in cart.values())
+    count = get_cart_store(request).count()
     return {'cart_count': count}
 
 def notification_count(request):
     count = 0
 
     if request.user.is_authenticated:
-        count = Notification.objects.filter(recipient=request.user, is_read=False).count()
+        # Denormalized counter on the profile; memoized for pages rendering several templates
+        if not hasattr(request, '_notif_count'):
+            request._notif_count = unread_count(request.user)
+        count = request._notif_count
     return {'notif_count': count}
\ No newline at end of file
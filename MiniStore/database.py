@@ -0,0 +1,70 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+# ---------------------------------------------------------
+#                   SQLITE TUNING
+# ---------------------------------------------------------
+# Out of the box SQLite uses a rollback journal: a writer blocks every reader,
+# and a transaction that starts reading and then writes (checkout) can fail
+# straight away with "database is locked" when another writer got there first.
+#
+# Every new connection (signals.py, connection_created) therefore switches to
+# WAL, where readers never block the writer and vice versa, and waits up to
+# busy_timeout for a lock instead of failing. Write transactions that read
+# first use write_transaction(), which takes the write lock at BEGIN
+# (BEGIN IMMEDIATE), so they queue on busy_timeout rather than deadlock.
+# Connections are kept for CONN_MAX_AGE (settings.py) so the pragmas are paid
+# once per worker thread, not once per request.
+#
+# `python manage.py sqlite_benchmark` compares the default setup with this one.
+
+PRAGMAS = {
+    "journal_mode": "WAL",        # persistent: stored in the database file
+    "synchronous": "NORMAL",      # fsync at checkpoints only; safe with WAL
+    "busy_timeout": 5000,         # ms to wait for a lock before "database is locked"
+    "mmap_size": 128 * 1024 * 1024,
+    "cache_size": -20000,         # negative = KiB, so ~20 MB page cache per connection
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",         # Django already does this; kept so the list is complete
+}
+
+
+def sqlite_pragmas():
+    """PRAGMAS with any SQLITE_PRAGMAS overrides from settings (None drops one)."""
+    pragmas = {**PRAGMAS, **getattr(settings, "SQLITE_PRAGMAS", {})}
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def configure_connection(connection):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@contextmanager
+def write_transaction(using=None):
+    """
+    transaction.atomic() that starts with BEGIN IMMEDIATE on SQLite.
+
+    Nested inside another atomic block it is a plain savepoint: the outer
+    block already decided how the transaction began.
+    """
+    connection = transaction.get_connection(using)
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    connection.ensure_connection()
+    mode = connection.transaction_mode
+    connection.transaction_mode = "IMMEDIATE"
+    try:
+        with transaction.atomic(using=using):
+            connection.transaction_mode = mode
+            yield
+    finally:
+        connection.transaction_mode = mode
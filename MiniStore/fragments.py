@@ -0,0 +1,81 @@
+import threading
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Product
+
+# ---------------------------------------------------------
+#                   PRODUCT CARD FRAGMENT CACHE
+# ---------------------------------------------------------
+# Catalog pages render the same product card markup for every visitor, so each
+# card is cached as HTML per (style, product id). The stored value carries a
+# stamp of what the card shows (the product's ``updated`` time and its
+# category's name and slug) and is only reused while it still matches, so a
+# category rename, which leaves ``updated`` alone, cannot leave old cards
+# behind. The Product/Category signals also delete the entries outright.
+
+CARD_TEMPLATE = "MiniStore/includes/product_card.html"
+CARD_TIMEOUT = 60 * 60 * 24
+
+# Card variations used by the catalog templates
+CARD_STYLES = {
+    "catalog": {"label": "General", "filter_attrs": False},
+    "arrivals": {"label": "Brand", "filter_attrs": False},
+    "shop": {"label": "General", "filter_attrs": True},
+}
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def card_cache_key(style, product_id):
+    return f"product_card:{style}:{product_id}"
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def card_cache_stats():
+    """Hit/miss counters for this process since start (or the last reset)."""
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_ratio": hits / total if total else 0.0}
+
+
+def reset_card_cache_stats():
+    with _stats_lock:
+        _stats["hits"] = _stats["misses"] = 0
+
+
+def _card_stamp(product):
+    stamp = product.updated.isoformat() if product.updated else ""
+    # Only when the catalog query already loaded the category (select_related): no query per card
+    if Product.category.is_cached(product) and product.category is not None:
+        stamp += f"|{product.category.name}|{product.category.slug}"
+    return stamp
+
+
+def render_product_card(product, style="catalog"):
+    key = card_cache_key(style, product.pk)
+    stamp = _card_stamp(product)
+
+    cached = cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        _record("hits")
+        return mark_safe(cached[1])
+
+    _record("misses")
+    html = render_to_string(CARD_TEMPLATE, {"product": product, **CARD_STYLES[style]})
+    cache.set(key, (stamp, html), CARD_TIMEOUT)
+    return mark_safe(html)
+
+
+def invalidate_product_cards(product_ids):
+    keys = [card_cache_key(style, pid) for pid in product_ids for style in CARD_STYLES]
+    if keys:
+        cache.delete_many(keys)
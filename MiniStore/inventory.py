@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models import F
+
+from .catalog import bump_catalog_version
+from .models import Product
+from .pagecache import purge_products, purge_tags
+
+# ---------------------------------------------------------
+#                   STOCK RESERVATION
+# ---------------------------------------------------------
+# Stock is taken with conditional updates:
+#     UPDATE product SET stock = stock - qty WHERE id = ? AND stock >= qty
+# The database checks and decrements in one statement, so two concurrent
+# checkouts can never both take the last unit. All lines of an order are
+# reserved inside the caller's transaction: if any line is short, the whole
+# order is rolled back and every short line is reported.
+
+
+class OutOfStockError(Exception):
+    """Raised when one or more order lines cannot be covered by stock."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__("; ".join(failure.message for failure in failures))
+
+
+class StockFailure:
+    def __init__(self, product, requested, in_stock):
+        self.product = product
+        self.requested = requested
+        self.in_stock = in_stock
+
+    @property
+    def message(self):
+        if self.in_stock <= 0:
+            return f"{self.product.name} is sold out."
+        return f"Only {self.in_stock} left of {self.product.name} (you asked for {self.requested})."
+
+
+def reserve_stock(lines):
+    """
+    Decrement stock for every (product, quantity) line or raise OutOfStockError.
+
+    Must run inside ``transaction.atomic()`` so a partial reservation is
+    rolled back together with the order. Products that hit zero are marked
+    unavailable.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        raise RuntimeError("reserve_stock() must be called inside transaction.atomic().")
+
+    failed = []
+    reserved_ids = []
+    for product, quantity in lines:
+        updated = Product.objects.filter(
+            pk=product.pk, available=True, stock__gte=quantity
+        ).update(stock=F("stock") - quantity)
+        if updated:
+            reserved_ids.append(product.pk)
+        else:
+            failed.append((product, quantity))
+
+    if failed:
+        current = dict(
+            Product.objects.filter(pk__in=[product.pk for product, _ in failed]).values_list("pk", "stock")
+        )
+        raise OutOfStockError([
+            StockFailure(product, quantity, current.get(product.pk, 0)) for product, quantity in failed
+        ])
+
+    # Queryset updates send no signals: drop cached pages showing the old stock
+    # ourselves. Only product pages show stock, listings can stay.
+    transaction.on_commit(lambda: purge_products(reserved_ids, catalog=False))
+    if Product.objects.filter(pk__in=reserved_ids, stock=0, available=True).update(available=False):
+        # Sold-out products drop out of the listings and the catalog counts
+        transaction.on_commit(lambda: purge_tags("catalog"))
+        transaction.on_commit(bump_catalog_version)
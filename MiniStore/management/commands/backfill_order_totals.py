@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from MiniStore.models import Order
+
+
+class Command(BaseCommand):
+    help = "Fill in Order.total/item_count for orders that don't have them (or all orders with --all)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Recompute every order, not just unset ones.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        orders = Order.objects.all() if options["all"] else Order.objects.filter(item_count=0)
+        orders = orders.with_totals().order_by("pk")
+
+        batch, updated = [], 0
+        for order in orders.iterator(chunk_size=options["batch_size"]):
+            order.total = order.computed_total or 0
+            order.item_count = order.computed_item_count or 0
+            batch.append(order)
+            if len(batch) >= options["batch_size"]:
+                updated += Order.objects.bulk_update(batch, ["total", "item_count"])
+                batch = []
+        if batch:
+            updated += Order.objects.bulk_update(batch, ["total", "item_count"])
+
+        self.stdout.write(self.style.SUCCESS(f"Updated totals on {updated} order(s)."))
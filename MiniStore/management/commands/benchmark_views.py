@@ -0,0 +1,180 @@
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from MiniStore.models import Product, UserProfile
+from MiniStore.seeding import seed_store
+
+VIEWS = (
+    "home", "shop", "product_detail", "cart_update", "checkout", "profile", "seller_dashboard", "admin_dashboard",
+)
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))]
+
+
+class Scenarios:
+    """Who requests each view and how; setup() runs untimed before every request."""
+
+    def __init__(self, seed_counts):
+        self.customer = (
+            User.objects.filter(profile__role="CUSTOMER").annotate(n=Count("orders")).order_by("-n", "pk").first()
+        )
+        self.seller = (
+            User.objects.filter(profile__role="SELLER").annotate(n=Count("products")).order_by("-n", "pk").first()
+        )
+        self.admin = User.objects.create_superuser("bench-admin", "admin@example.com", "unused")
+        UserProfile.objects.create(user=self.admin, role="ADMIN")
+        available = Product.objects.filter(available=True)
+        self.slugs = list(available.order_by("-stock", "pk").values_list("slug", flat=True)[:50])
+        self.cart_product = available.order_by("-stock", "pk").first()
+        self.seed_counts = seed_counts
+        self._turn = 0
+
+    def actor(self, view):
+        return {
+            "home": None, "shop": None, "product_detail": None,
+            "seller_dashboard": self.seller, "admin_dashboard": self.admin,
+        }.get(view, self.customer)
+
+    def setup(self, view, client):
+        if view in ("cart_update", "checkout"):
+            client.post(reverse("cart_add", args=[self.cart_product.pk]), {"quantity": 1})
+
+    def request(self, view, client):
+        self._turn += 1
+        if view == "product_detail":
+            return client.get(reverse("product_detail", args=[self.slugs[self._turn % len(self.slugs)]]))
+        if view == "cart_update":
+            return client.post(
+                reverse("cart_update", args=[self.cart_product.pk]), {"action": "increase"},
+                HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+            )
+        if view == "checkout":
+            return client.post(reverse("checkout"), {
+                "first_name": "Bench", "last_name": "Mark", "email": "bench@example.com",
+                "address": "1 Bench Street", "postal_code": "1000", "city": "Manila",
+            })
+        return client.get(reverse(view))
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database (see seed_store) and time the main views through the test client. "
+        "Prints p50/p95 latency, query counts and peak memory per view as JSON, so runs can be diffed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=2000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--order-items", type=int, default=20000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--requests", type=int, default=30, help="Timed requests per view (default: 30).")
+        parser.add_argument("--views", nargs="+", choices=VIEWS, default=list(VIEWS))
+        parser.add_argument(
+            "--page-cache", action="store_true",
+            help="Leave the anonymous page cache on (by default it is off so the views themselves are timed).",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        # A throwaway cache as well as a throwaway database: the live site's cache is left alone,
+        # and every run starts from the same empty cache
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cache_dir},
+        }):
+            counts, seed_seconds, results = self.run_benchmark(options)
+
+        report = {
+            "config": {
+                "products": options["products"], "users": options["users"], "order_items": options["order_items"],
+                "seed": options["seed"], "requests": options["requests"], "page_cache": options["page_cache"],
+            },
+            "environment": {
+                "python": platform.python_version(), "django": django.get_version(), "database": connection.vendor,
+            },
+            "seeded": counts,
+            "seed_seconds": round(seed_seconds, 2),
+            "views": results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def run_benchmark(self, options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            started = time.perf_counter()
+            counts = seed_store(
+                products=options["products"], users=options["users"], order_items=options["order_items"],
+                seed=options["seed"],
+            )
+            seed_seconds = time.perf_counter() - started
+
+            page_cache = {} if options["page_cache"] else {"PAGE_CACHE_TIMEOUT": 0}
+            with override_settings(**page_cache):
+                scenarios = Scenarios(counts)
+                results = {view: self.measure(view, scenarios, options["requests"]) for view in options["views"]}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        return counts, seed_seconds, results
+
+    def measure(self, view, scenarios, requests):
+        client = Client()
+        actor = scenarios.actor(view)
+        if actor is not None:
+            client.force_login(actor)
+
+        # One untimed request first: warms caches and catches a broken scenario early
+        scenarios.setup(view, client)
+        status = scenarios.request(view, client).status_code
+        if status >= 400:
+            raise CommandError(f"{view} answered {status}; the benchmark scenario needs fixing.")
+
+        latencies, queries = [], []
+        for _ in range(requests):
+            scenarios.setup(view, client)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                scenarios.request(view, client)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        # Peak memory from a separate request: tracemalloc would distort the timings
+        scenarios.setup(view, client)
+        tracemalloc.start()
+        try:
+            scenarios.request(view, client)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "status": status,
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "queries": _percentile(queries, 50),
+            "max_queries": max(queries),
+            "peak_memory_kib": round(peak / 1024, 1),
+        }
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from MiniStore.models import Cart
+
+
+class Command(BaseCommand):
+    help = "Delete saved carts that have not been touched for a number of days."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Inactivity threshold (default: 30).")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many carts would go.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        # Item updates don't touch Cart.updated, so the latest item change counts too
+        abandoned = Cart.objects.annotate(
+            last_activity=Greatest("updated", Coalesce(Max("items__updated"), "updated"))
+        ).filter(last_activity__lt=cutoff)
+
+        count = abandoned.count()
+        if not options["dry_run"]:
+            Cart.objects.filter(pk__in=list(abandoned.values_list("pk", flat=True))).delete()
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} abandoned cart(s) older than {options['days']} days."))
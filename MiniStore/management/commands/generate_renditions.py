@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from MiniStore.models import Product
+from MiniStore.renditions import PRESETS, RenditionError, pregenerate
+
+
+class Command(BaseCommand):
+    help = "Pre-render resized product images for every srcset preset (skips ones already cached)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--preset", action="append", choices=sorted(PRESETS),
+            help="Only render this preset (repeatable). Default: all presets.",
+        )
+
+    def handle(self, *args, **options):
+        images = Product.objects.exclude(image="").values_list("image", flat=True).distinct()
+        rendered, failed = 0, 0
+        for name in images.iterator():
+            try:
+                rendered += pregenerate(name, presets=options["preset"])
+            except RenditionError as exc:
+                failed += 1
+                self.stderr.write(f"Skipped {name}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{rendered} rendition(s) ready, {failed} image(s) skipped."
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from MiniStore.search import create_fts_table, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text product search index from the product table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        if not create_fts_table(connections[using]):
+            raise CommandError("This database does not support SQLite FTS5; search uses the icontains fallback.")
+        count = rebuild_index(using=using)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} products."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from MiniStore.rollups import rebuild_rollups, refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Fold new orders into the daily sales rollup tables (or rebuild them with --rebuild)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute every rollup row from scratch.")
+        parser.add_argument(
+            "--settle", type=int, default=60,
+            help="Leave orders younger than this many seconds for the next run (default: 60).",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            written = rebuild_rollups(settle=options["settle"])
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups: {written} row(s) written."))
+        else:
+            count = refresh_rollups(settle=options["settle"])
+            self.stdout.write(self.style.SUCCESS(f"Folded {count} new order(s) into the rollups."))
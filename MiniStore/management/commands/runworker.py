@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import autodiscover_modules
+
+from MiniStore.taskqueue import Worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks from the Task table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=2, help="Worker threads (default: 2).")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--lock-timeout", type=int, default=300,
+                            help="Seconds before a RUNNING task is assumed abandoned and re-queued.")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        # Import every app's tasks.py so their @task functions are registered
+        autodiscover_modules("tasks")
+
+        worker = Worker(
+            concurrency=options["concurrency"],
+            poll_interval=options["poll_interval"],
+            lock_timeout=options["lock_timeout"],
+        )
+        self.stdout.write(f"Worker {worker.worker_id} started with {worker.concurrency} thread(s).")
+        try:
+            worker.run(once=options["once"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping worker.")
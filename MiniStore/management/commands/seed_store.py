@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from MiniStore.seeding import SEED_PASSWORD, SeedError, clear_seeded, seed_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a synthetic store (bulk inserts, fixed seed), e.g. "
+        "--products 100000 --users 50000 --order-items 1000000. Seeded rows can be removed with --clear."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1000)
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--order-items", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42, help="Same seed, same store (default: 42).")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--clear", action="store_true", help="Delete previously seeded rows first.")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            self.stdout.write(f"Removed {clear_seeded()} seeded row(s).")
+
+        started = time.perf_counter()
+        try:
+            counts = seed_store(
+                products=options["products"], users=options["users"], order_items=options["order_items"],
+                seed=options["seed"], batch_size=options["batch_size"], progress=self.stdout.write,
+            )
+        except SeedError as exc:
+            raise CommandError(exc)
+
+        summary = ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {time.perf_counter() - started:.1f}s."))
+        self.stdout.write(f"Seeded users log in with the password {SEED_PASSWORD!r}.")
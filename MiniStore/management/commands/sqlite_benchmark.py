@@ -0,0 +1,124 @@
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from MiniStore.database import sqlite_pragmas
+
+PRODUCTS = 2000
+
+SCHEMA = """
+CREATE TABLE product (id INTEGER PRIMARY KEY, name TEXT NOT NULL, stock INTEGER NOT NULL);
+CREATE INDEX product_name ON product (name);
+CREATE TABLE order_item (id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, quantity INTEGER NOT NULL);
+"""
+
+# (label, pragmas, BEGIN statement of the checkout transaction)
+SETUPS = (
+    ("default", {}, "BEGIN"),
+    ("tuned", None, "BEGIN IMMEDIATE"),  # None: MiniStore.database pragmas
+)
+
+
+def _connect(path, pragmas):
+    # Python's default 5 s lock timeout, as Django uses it
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def _read(conn, rng):
+    # A catalog page: one page of names plus the total
+    start = f"product {rng.randrange(PRODUCTS):05d}"
+    conn.execute("SELECT id, name, stock FROM product WHERE name >= ? ORDER BY name LIMIT 12", (start,)).fetchall()
+    conn.execute("SELECT COUNT(*) FROM product WHERE stock > 0").fetchone()
+
+
+def _checkout(conn, rng, begin):
+    # Read the stock, then write: the pattern that deadlocks under a deferred BEGIN
+    product_id = rng.randrange(1, PRODUCTS + 1)
+    conn.execute(begin)
+    try:
+        conn.execute("SELECT stock FROM product WHERE id = ?", (product_id,)).fetchone()
+        conn.execute("UPDATE product SET stock = stock - 1 WHERE id = ? AND stock > 0", (product_id,))
+        conn.execute("INSERT INTO order_item (product_id, quantity) VALUES (?, 1)", (product_id,))
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent read/checkout throughput on a scratch SQLite file with the "
+        "default setup and with the WAL/pragma/BEGIN IMMEDIATE setup from MiniStore.database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4, help="Reader threads (default: 4).")
+        parser.add_argument("--writers", type=int, default=4, help="Checkout threads (default: 4).")
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run (default: 5).")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['readers']} readers + {options['writers']} writers, {options['seconds']:g}s per setup "
+            "(scratch database, db.sqlite3 is not touched)"
+        )
+        for label, pragmas, begin in SETUPS:
+            result = self.run(sqlite_pragmas() if pragmas is None else pragmas, begin, options)
+            self.stdout.write(
+                f"{label:>8}: {result['reads'] / result['elapsed']:8.0f} reads/s  "
+                f"{result['writes'] / result['elapsed']:7.0f} checkouts/s  "
+                f"{result['errors']} 'database is locked' errors"
+            )
+
+    def run(self, pragmas, begin, options):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "bench.sqlite3")
+            setup = _connect(path, pragmas)
+            setup.executescript(SCHEMA)
+            setup.executemany(
+                "INSERT INTO product (name, stock) VALUES (?, ?)",
+                ((f"product {i:05d}", 1000) for i in range(PRODUCTS)),
+            )
+            setup.close()
+
+            counts = {"reads": 0, "writes": 0, "errors": 0}
+            lock = threading.Lock()
+            deadline = time.perf_counter() + options["seconds"]
+
+            def worker(kind, seed):
+                rng = random.Random(seed)
+                conn = _connect(path, pragmas)
+                done = errors = 0
+                try:
+                    while time.perf_counter() < deadline:
+                        try:
+                            if kind == "reads":
+                                _read(conn, rng)
+                            else:
+                                _checkout(conn, rng, begin)
+                            done += 1
+                        except sqlite3.OperationalError:
+                            errors += 1
+                finally:
+                    conn.close()
+                with lock:
+                    counts[kind] += done
+                    counts["errors"] += errors
+
+            threads = [threading.Thread(target=worker, args=("reads", i)) for i in range(options["readers"])]
+            threads += [threading.Thread(target=worker, args=("writes", 100 + i)) for i in range(options["writers"])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            counts["elapsed"] = time.perf_counter() - started
+            return counts
@@ -0,0 +1,345 @@
+import json
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.template.backends.django import DjangoTemplates, Template
+from django.urls import Resolver404, resolve
+
+from .fragments import card_cache_stats
+from .pagecache import page_cache_stats
+
+# ---------------------------------------------------------
+#                   REQUEST METRICS
+# ---------------------------------------------------------
+# MetricsMiddleware times every request and files it under its URL name:
+#
+#   ministore_request_duration_seconds   histogram, wall time of the request
+#   ministore_response_size_bytes        histogram, body size
+#   ministore_requests_total             counter, per status class (2xx, 4xx...)
+#   ministore_sql_queries_total          counter, queries run (execute_wrapper)
+#   ministore_sql_seconds_total          counter, time spent in those queries
+#   ministore_template_seconds_total     counter, time spent rendering templates
+#
+# plus the page cache and product card cache hit/miss counters. Staff (or a
+# scraper sending METRICS_TOKEN as a bearer token) read them at /metrics in
+# the Prometheus text format.
+#
+# A request collects its numbers without locking and adds them to the process
+# totals in one go at the end. With several worker processes, set
+# METRICS_SPOOL to a file path: each process then adds its totals to that
+# SQLite file every METRICS_SPOOL_INTERVAL seconds (and when /metrics is read),
+# so any worker answers /metrics for all of them.
+
+PREFIX = "ministore_"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# metric: (type, help text)
+METRICS = {
+    "request_duration_seconds": ("histogram", "Time to answer a request, by URL name."),
+    "response_size_bytes": ("histogram", "Response body size, by URL name."),
+    "requests_total": ("counter", "Requests answered, by URL name and status class."),
+    "sql_queries_total": ("counter", "SQL queries run while answering requests, by URL name."),
+    "sql_seconds_total": ("counter", "Time spent in SQL queries, by URL name."),
+    "template_seconds_total": ("counter", "Time spent rendering templates, by URL name."),
+    "page_cache_hits_total": ("counter", "Anonymous pages served from the page cache."),
+    "page_cache_misses_total": ("counter", "Cacheable anonymous pages that had to be rendered."),
+    "card_cache_hits_total": ("counter", "Product cards served from the fragment cache."),
+    "card_cache_misses_total": ("counter", "Product cards that had to be rendered."),
+}
+BUCKETS = {"request_duration_seconds": DURATION_BUCKETS, "response_size_bytes": SIZE_BUCKETS}
+
+# (series name, ((label, value), ...)) -> value, added to since the last spool flush
+_series = defaultdict(float)
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+_cache_stats_seen = {}
+_local = threading.local()
+
+
+def metrics_enabled():
+    return getattr(settings, "METRICS_ENABLED", True)
+
+
+def spool_path():
+    return getattr(settings, "METRICS_SPOOL", None)
+
+
+def spool_interval():
+    return getattr(settings, "METRICS_SPOOL_INTERVAL", 5)
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# --- per-request collection ---
+
+class RequestStats:
+    """Numbers for the request in progress; only its own thread touches them."""
+
+    __slots__ = ("queries", "sql_seconds", "template_seconds", "template_depth")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = getattr(_local, "stats", None)
+        if stats is None:
+            return super().render(context, request)
+        # Templates rendered while another one renders (cached product cards) are already inside its time
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing renders for MetricsMiddleware (TEMPLATES "BACKEND")."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def _view_name(request):
+    match = request.resolver_match
+    if match is None:
+        # Answered by middleware before the URL resolver ran (page cache hits)
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return "unmatched"
+    return match.view_name
+
+
+def _response_size(response):
+    if not response.streaming:
+        return len(response.content)
+    length = response.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def _observe(series, metric, labels, value):
+    # Buckets are stored individually (one increment) and made cumulative by render_metrics()
+    buckets, name = BUCKETS[metric], PREFIX + metric
+    index = bisect_left(buckets, value)
+    le = _format_value(buckets[index]) if index < len(buckets) else "+Inf"
+    series[(f"{name}_bucket", labels + (("le", le),))] += 1
+    series[(f"{name}_sum", labels)] += value
+    series[(f"{name}_count", labels)] += 1
+
+
+def record_request(view, status, seconds, size, stats):
+    """Add one finished request to the process totals."""
+    labels = (("view", view),)
+    changes = defaultdict(float)
+    _observe(changes, "request_duration_seconds", labels, seconds)
+    if size is not None:
+        _observe(changes, "response_size_bytes", labels, size)
+    changes[(PREFIX + "requests_total", labels + (("status", f"{status // 100}xx"),))] += 1
+    changes[(PREFIX + "sql_queries_total", labels)] += stats.queries
+    changes[(PREFIX + "sql_seconds_total", labels)] += stats.sql_seconds
+    changes[(PREFIX + "template_seconds_total", labels)] += stats.template_seconds
+
+    with _lock:
+        for key, value in changes.items():
+            _series[key] += value
+
+
+class MetricsMiddleware:
+    """Records latency, SQL, template time and size of every request (see above)."""
+
+    def __init__(self, get_response):
+        if not metrics_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        _local.stats = stats
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(stats):
+                response = self.get_response(request)
+        finally:
+            _local.stats = None
+        seconds = time.perf_counter() - started
+
+        record_request(_view_name(request), response.status_code, seconds, _response_size(response), stats)
+        if spool_path() and time.monotonic() - _last_flush >= spool_interval():
+            flush_spool()
+        return response
+
+
+# --- cache counters (kept by pagecache.py and fragments.py) ---
+
+def _cache_counts():
+    return {
+        f"{PREFIX}{cache_name}_{outcome}_total": stats[outcome]
+        for cache_name, stats in (("page_cache", page_cache_stats()), ("card_cache", card_cache_stats()))
+        for outcome in ("hits", "misses")
+    }
+
+
+def _collect_cache_stats():
+    """Move the cache hit/miss counts gained since the last call into the totals."""
+    current = _cache_counts()
+    with _lock:
+        for name, count in current.items():
+            seen = _cache_stats_seen.get(name, 0)
+            # A reset_*_stats() call starts the counter again from zero
+            _series[(name, ())] += count - seen if count >= seen else count
+            _cache_stats_seen[name] = count
+
+
+# --- multi-process spool ---
+
+def _connect_spool(path):
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS metric ("
+        "series TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, PRIMARY KEY (series, labels))"
+    )
+    return conn
+
+
+def flush_spool():
+    """Add this process's totals to the METRICS_SPOOL file. Returns False if it was busy (retried later)."""
+    global _last_flush
+    path = spool_path()
+    if not path:
+        return False
+    _collect_cache_stats()
+    with _lock:
+        pending = dict(_series)
+        _series.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return True
+
+    rows = [(series, json.dumps(labels), value) for (series, labels), value in pending.items()]
+    try:
+        conn = _connect_spool(path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO metric (series, labels, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (series, labels) DO UPDATE SET value = value + excluded.value",
+                rows,
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        # Keep the numbers for the next flush
+        with _lock:
+            for key, value in pending.items():
+                _series[key] += value
+        return False
+    return True
+
+
+def snapshot():
+    """{(series, labels): value} for this process, or for every process sharing the spool."""
+    path = spool_path()
+    if not path:
+        _collect_cache_stats()
+        with _lock:
+            return dict(_series)
+
+    flush_spool()
+    conn = _connect_spool(path)
+    try:
+        rows = conn.execute("SELECT series, labels, value FROM metric").fetchall()
+    finally:
+        conn.close()
+    return {(series, tuple(tuple(pair) for pair in json.loads(labels))): value for series, labels, value in rows}
+
+
+def reset_metrics():
+    """Forget this process's totals (the spool file is left alone)."""
+    global _last_flush
+    current = _cache_counts()
+    with _lock:
+        _series.clear()
+        _cache_stats_seen.update(current)
+        _last_flush = time.monotonic()
+
+
+# --- Prometheus text format ---
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def render_metrics(series=None):
+    """The totals in the Prometheus text exposition format (version 0.0.4)."""
+    series = snapshot() if series is None else series
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        name = PREFIX + metric
+        if kind == "histogram":
+            samples = _histogram_samples(metric, series)
+        else:
+            samples = sorted((name, labels, value) for (key, labels), value in series.items() if key == name)
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{sample}{_format_labels(labels)} {_format_value(value)}" for sample, labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def _histogram_samples(metric, series):
+    """Cumulative _bucket samples followed by _sum and _count, per label set."""
+    name = PREFIX + metric
+    per_bucket = defaultdict(dict)
+    for (key, labels), value in series.items():
+        if key == f"{name}_bucket":
+            le = dict(labels)["le"]
+            per_bucket[tuple(pair for pair in labels if pair[0] != "le")][le] = value
+
+    bounds = [_format_value(bound) for bound in BUCKETS[metric]] + ["+Inf"]
+    samples = []
+    for labels in sorted(per_bucket):
+        total = 0
+        for le in bounds:
+            total += per_bucket[labels].get(le, 0)
+            samples.append((f"{name}_bucket", labels + (("le", le),), total))
+        samples.append((f"{name}_sum", labels, series.get((f"{name}_sum", labels), 0)))
+        samples.append((f"{name}_count", labels, series.get((f"{name}_count", labels), 0)))
+    return samples
@@ -0,0 +1,92 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+
+# ---------------------------------------------------------
+#                   PRECOMPRESSED STATIC FILES
+# ---------------------------------------------------------
+# Serves files from STATIC_ROOT (built by collectstatic, see storage.py)
+# straight from Django, picking the .br/.gz sibling the browser accepts.
+# Content-hashed names never change content, so they are cached for a year
+# as immutable; everything else gets a short max-age. With DEBUG on,
+# runserver serves /static/ itself and this middleware is never reached.
+
+HASHED_MAX_AGE = 60 * 60 * 24 * 365
+PLAIN_MAX_AGE = 60 * 5
+
+# (Accept-Encoding token, file suffix), in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def parse_accept(header):
+    """{token: q} for an Accept or Accept-Encoding header; q defaults to 1, "q=0" means "not acceptable"."""
+    accepted = {}
+    for part in (header or "").split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+class PrecompressedStaticMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith("/") else f"/{settings.STATIC_URL}"
+        self.root = settings.STATIC_ROOT
+        self._hashed_names = None
+
+    def hashed_names(self):
+        """Names written by the manifest storage (values of staticfiles.json)."""
+        if self._hashed_names is None:
+            hashed_files = getattr(staticfiles_storage, "hashed_files", {})
+            self._hashed_names = set(hashed_files.values())
+        return self._hashed_names
+
+    def __call__(self, request):
+        if request.method in ("GET", "HEAD") and request.path.startswith(self.prefix) and self.root:
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        content_type, _ = mimetypes.guess_type(path)
+        accepted = parse_accept(request.headers.get("Accept-Encoding"))
+        served, encoding = path, None
+        for token, suffix in ENCODINGS:
+            if accepted.get(token, accepted.get("*", 0)) > 0 and os.path.isfile(path + suffix):
+                served, encoding = path + suffix, token
+                break
+
+        response = FileResponse(open(served, "rb"), content_type=content_type or "application/octet-stream")
+        if encoding:
+            response["Content-Encoding"] = encoding
+        if name in self.hashed_names():
+            response["Cache-Control"] = f"public, max-age={HASHED_MAX_AGE}, immutable"
+        else:
+            response["Cache-Control"] = f"public, max-age={PLAIN_MAX_AGE}"
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
@@ -0,0 +1,49 @@
+from django.db import OperationalError, migrations
+
+# Kept self-contained (no MiniStore.search import), so later changes to the
+# app code cannot change what this migration does.
+FTS_TABLE = "MiniStore_product_fts"
+
+CREATE_SQL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABLE}" USING fts5('
+    "name, description, category, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+BACKFILL_SQL = (
+    f'INSERT INTO "{FTS_TABLE}" (rowid, name, description, category) '
+    'SELECT p."id", p."name", p."description", COALESCE(c."name", \'\') '
+    'FROM "MiniStore_product" p LEFT JOIN "MiniStore_category" c ON c."id" = p."category_id"'
+)
+
+
+def create_index(apps, schema_editor):
+    # No-op on backends (or SQLite builds) without FTS5; search falls back to icontains.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(CREATE_SQL)
+        except OperationalError:
+            # SQLite compiled without FTS5
+            return
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}"')
+        cursor.execute(BACKFILL_SQL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS "{FTS_TABLE}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MiniStore', '0008_alter_userprofile_seller_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:53
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_unread_counts(apps, schema_editor):
+    Notification = apps.get_model('MiniStore', 'Notification')
+    UserProfile = apps.get_model('MiniStore', 'UserProfile')
+    counts = (
+        Notification.objects.filter(is_read=False)
+        .values('recipient_id')
+        .annotate(n=Count('id'))
+    )
+    for row in counts:
+        UserProfile.objects.filter(user_id=row['recipient_id']).update(unread_notifications=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MiniStore', '0011_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:54
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum
+
+
+def backfill_order_totals(apps, schema_editor):
+    Order = apps.get_model('MiniStore', 'Order')
+    OrderItem = apps.get_model('MiniStore', 'OrderItem')
+    rows = (
+        OrderItem.objects.values('order_id')
+        .annotate(
+            total=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+            item_count=Sum('quantity'),
+        )
+    )
+    orders = [Order(pk=row['order_id'], total=row['total'], item_count=row['item_count']) for row in rows]
+    Order.objects.bulk_update(orders, ['total', 'item_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MiniStore', '0012_userprofile_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
 
 # --- 1. ROLE DEFINITIONS ---
 ROLE_CHOICES = (
@@ -50,6 +51,16 @@ class Product(models.Model):
         ordering = ("name",)
         verbose_name = "product"
         verbose_name_plural = "products"
+        indexes = [
+            # Catalog listings: available products of one category, by name. Django writes
+            # `available=True` as a bare `WHERE "available"`, which SQLite only matches
+            # against a partial-index condition, not an indexed column.
+            models.Index(
+                fields=["category", "name"], condition=models.Q(available=True), name="product_avail_cat_name_idx"
+            ),
+            # Seller views: a seller's products, newest first
+            models.Index(fields=["created_by", "created"], name="product_seller_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -82,10 +93,25 @@ class UserProfile(models.Model):
 )
     seller_status = models.CharField(max_length=50, choices=SELLER_STATUS_CHOICES, default='NONE')
 
+    # --- DENORMALIZED COUNTERS ---
+    # Kept in step by signals/views; `manage.py reconcile_notification_counts` repairs drift
+    unread_notifications = models.PositiveIntegerField(default=0)
+
     def __str__(self) -> str:
         return f"{self.user.username} ({self.role} - {self.seller_status})"
 
 # --- 4. ORDER MODELS ---
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate totals computed from the items (for orders whose stored totals are unset)."""
+        return self.annotate(
+            computed_total=models.Sum(
+                models.F("items__price") * models.F("items__quantity"),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            computed_item_count=models.Sum("items__quantity"),
+        )
+
 class Order(models.Model):
     user = models.ForeignKey(
         User,
@@ -105,16 +131,39 @@ class Order(models.Model):
     updated = models.DateTimeField(auto_now=True)
     paid = models.BooleanField(default=False)
 
+    # Stored at checkout so order lists don't need to load the items
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ("-created",)
+        indexes = [models.Index(fields=["user", "created"], name="order_user_created_idx")]
 
     def __str__(self) -> str:
         return f"Order {self.id}"
 
     def get_total_cost(self):
-        """Calculate total cost of all items in the order."""
+        """Total cost of all items: stored value, annotation, or (old orders) summed from the items."""
+        if self.item_count:
+            return self.total
+        if getattr(self, "computed_total", None) is not None:
+            return self.computed_total
         return sum(item.get_cost() for item in self.items.all())
 
+    def update_totals(self, save=True):
+        """Recompute total/item_count from the items (e.g. after editing items in the admin)."""
+        totals = OrderItem.objects.filter(order=self).aggregate(
+            total=models.Sum(models.F("price") * models.F("quantity"),
+                             output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+            item_count=models.Sum("quantity"),
+        )
+        self.total = totals["total"] or 0
+        self.item_count = totals["item_count"] or 0
+        if save:
+            Order.objects.filter(pk=self.pk).update(total=self.total, item_count=self.item_count)
+
 class OrderItem(models.Model):
     """Tracks the individual items and quantities within a single Order."""
     order = models.ForeignKey(Order, related_name="items", on_delete=models.CASCADE)
@@ -129,7 +178,31 @@ class OrderItem(models.Model):
         """Calculate cost for this item (price * quantity)."""
         return self.price * self.quantity
 
-# --- 5. NOTIFICATIONS ---
+# --- 5. PERSISTENT CART (CART_BACKEND = "database") ---
+class Cart(models.Model):
+    """A logged-in user's saved cart; survives logout and follows them across devices."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="cart")
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Cart of {self.user.username}"
+
+class CartItem(models.Model):
+    cart = models.ForeignKey(Cart, related_name="items", on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name="cart_items", on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "product"], name="unique_cart_product"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.product.name} ({self.quantity})"
+
+# --- 6. NOTIFICATIONS ---
 class Notification(models.Model):
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
     message = models.CharField(max_length=255)
@@ -141,6 +214,80 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        # Unread notifications of one recipient, newest first (badge recount, mark-all-read);
+        # is_read is the partial-index condition, as for Product's listing index
+        indexes = [
+            models.Index(
+                fields=["recipient", "created_at"], condition=models.Q(is_read=False), name="notif_recipient_unread_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Notification for {self.recipient.username}: {self.message}"
+
+# --- 7. BACKGROUND TASKS (see taskqueue.py) ---
+class Task(models.Model):
+    STATUS_CHOICES = (
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("DONE", "Done"),
+        ("FAILED", "Failed"),
+    )
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PENDING")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("run_at", "id")
+        indexes = [models.Index(fields=["status", "run_at"], name="task_status_run_at_idx")]
+
+    def __str__(self):
+        return f"{self.name} [{self.status}]"
+
+# --- 8. DAILY SALES ROLLUPS (see rollups.py) ---
+class DailySales(models.Model):
+    """One day of sales for one key (product, seller or category)."""
+    day = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+        ordering = ("day",)
+
+class ProductDailySales(DailySales):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="daily_sales")
+
+    class Meta(DailySales.Meta):
+        constraints = [models.UniqueConstraint(fields=["product", "day"], name="unique_product_day")]
+
+class SellerDailySales(DailySales):
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_sales")
+
+    class Meta(DailySales.Meta):
+        constraints = [models.UniqueConstraint(fields=["seller", "day"], name="unique_seller_day")]
+
+class CategoryDailySales(DailySales):
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="daily_sales")
+
+    class Meta(DailySales.Meta):
+        constraints = [models.UniqueConstraint(fields=["category", "day"], name="unique_category_day")]
+
+class RollupWatermark(models.Model):
+    """Highest order id already folded into the rollup tables."""
+    name = models.CharField(max_length=50, unique=True)
+    last_order_id = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Notification for {self.recipient.username}: {self.message}"
\ No newline at end of file
+        return f"{self.name} @ order {self.last_order_id}"
@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Notification, UserProfile
+
+# ---------------------------------------------------------
+#                   UNREAD NOTIFICATION COUNTER
+# ---------------------------------------------------------
+# UserProfile.unread_notifications mirrors
+#     Notification.objects.filter(recipient=user, is_read=False).count()
+# so the navbar badge reads it off the profile base.html already loads.
+# Single creates/deletes are tracked by signals; bulk inserts and the
+# "mark all read" update adjust it explicitly.
+
+
+def increment_unread(counts):
+    """Add to the counters, e.g. {user_id: 1, other_user_id: 3}. One UPDATE per distinct amount."""
+    users_by_amount = defaultdict(list)
+    for user_id, amount in counts.items():
+        if amount:
+            users_by_amount[amount].append(user_id)
+    for amount, user_ids in users_by_amount.items():
+        UserProfile.objects.filter(user_id__in=user_ids).update(
+            unread_notifications=Greatest(F("unread_notifications") + amount, 0)
+        )
+
+
+def bulk_notify(notifications):
+    """bulk_create Notifications and bump their recipients' counters."""
+    created = Notification.objects.bulk_create(notifications)
+    counts = defaultdict(int)
+    for notification in created:
+        if not notification.is_read:
+            counts[notification.recipient_id] += 1
+    increment_unread(counts)
+    return created
+
+
+def mark_all_read(user):
+    """Mark the user's unread notifications read; returns how many changed."""
+    changed = Notification.objects.filter(recipient=user, is_read=False).update(is_read=True)
+    if changed:
+        increment_unread({user.pk: -changed})
+    return changed
+
+
+def unread_count(user):
+    try:
+        return user.profile.unread_notifications
+    except UserProfile.DoesNotExist:
+        # e.g. a superuser made with createsuperuser has no profile row
+        return Notification.objects.filter(recipient=user, is_read=False).count()
+
+
+def reconcile_unread_counts():
+    """Reset every counter to the true unread count. Returns the number of profiles fixed."""
+    actual = dict(
+        Notification.objects.filter(is_read=False)
+        .values_list("recipient_id")
+        .annotate(n=Count("id"))
+        .values_list("recipient_id", "n")
+    )
+    fixed = 0
+    for profile_id, user_id, stored in UserProfile.objects.values_list("id", "user_id", "unread_notifications"):
+        expected = actual.get(user_id, 0)
+        if stored != expected:
+            UserProfile.objects.filter(pk=profile_id).update(unread_notifications=expected)
+            fixed += 1
+    return fixed
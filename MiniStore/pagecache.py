@@ -0,0 +1,202 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import cc_delim_re, get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+# ---------------------------------------------------------
+#                   ANONYMOUS PAGE CACHE
+# ---------------------------------------------------------
+# Catalog pages look the same for every visitor without cookies (no session,
+# no cart, no messages), so PageCacheMiddleware keeps their whole response in
+# the Django cache and serves it before sessions, auth or the URL resolver run.
+#
+# Each cached page carries surrogate keys ("tags") naming what it shows:
+#
+#   product:<id>      a product's detail page
+#   category:<slug>   a category listing, and detail pages of its products
+#   catalog           every listing (home, shop, category pages)
+#
+# A tag is just a version number in the cache. The page remembers the versions
+# it was rendered with and is only served while they all still match, so
+# purging a tag (signals.py) is one cache.incr() however many pages carry it.
+#
+# Only views decorated with @cache_anonymous_page are stored, and only when the
+# response sets no cookies and did not use a CSRF token.
+#
+# Pages and tag versions must live in a cache every worker process shares
+# (settings.CACHES): with a per-process cache a purge only reaches the process
+# that made the change. `manage.py check` warns about that (MiniStore.W001).
+
+TAG_PREFIX = "pagecache:tag:"
+PAGE_PREFIX = "pagecache:page:"
+
+# Backends whose entries only the current process sees
+PER_PROCESS_CACHES = ("django.core.cache.backends.locmem.LocMemCache",)
+
+# Vary headers that are safe to ignore: cached pages are only served to requests without cookies
+_IGNORED_VARY = {"cookie"}
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def page_cache_timeout():
+    return getattr(settings, "PAGE_CACHE_TIMEOUT", 60 * 10)
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def page_cache_stats():
+    """Hit/miss counters for this process since start (or the last reset)."""
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_ratio": hits / total if total else 0.0}
+
+
+def reset_page_cache_stats():
+    with _stats_lock:
+        _stats["hits"] = _stats["misses"] = 0
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if page_cache_timeout() and backend in PER_PROCESS_CACHES:
+        return [checks.Warning(
+            "The page cache is on, but the default cache is per process: purges only reach the "
+            "process that changed the catalog, other workers keep serving old pages.",
+            hint="Use a shared cache backend (file, database, Redis), run a single process, "
+                 "or set PAGE_CACHE_TIMEOUT = 0.",
+            id="MiniStore.W001",
+        )]
+    return []
+
+
+# --- tags ---
+
+def _tag_versions(tags):
+    keys = {TAG_PREFIX + tag: tag for tag in tags}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        # Start from the clock, so a tag the cache forgot never matches a page stored before
+        cache.add(key, time.time_ns(), None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def purge_tags(*tags):
+    """Invalidate every cached page carrying any of these tags."""
+    for tag in tags:
+        try:
+            cache.incr(TAG_PREFIX + tag)
+        except ValueError:
+            pass  # never used, so no page can carry it
+
+
+def purge_products(product_ids, catalog=True):
+    """Invalidate the products' own pages and, unless catalog=False, every listing."""
+    purge_tags(*(["catalog"] if catalog else []), *(f"product:{pk}" for pk in product_ids))
+
+
+def tag_page(request, *tags):
+    """Attach surrogate keys to the page being rendered (no-op unless it is cacheable)."""
+    page_tags = getattr(request, "_page_cache_tags", None)
+    if page_tags is not None:
+        page_tags.update(_tag_versions(tags))
+
+
+def cache_anonymous_page(view):
+    """Let PageCacheMiddleware store this view's responses for cookie-less visitors."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if getattr(request, "_page_cache_key", None):
+            request._page_cache_tags = {}
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+# --- middleware ---
+
+def _cacheable_request(request):
+    return (
+        request.method in ("GET", "HEAD")
+        and not request.COOKIES
+        and "Authorization" not in request.headers
+        and page_cache_timeout() > 0
+    )
+
+
+def _page_key(request):
+    return PAGE_PREFIX + hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+
+
+def _storable(request, response):
+    if request.method != "GET" or response.status_code != 200 or response.streaming:
+        return False
+    if response.cookies or request.META.get("CSRF_COOKIE_USED"):
+        return False
+    cache_control = response.get("Cache-Control", "").lower()
+    if "private" in cache_control or "no-store" in cache_control:
+        return False
+    vary = {header.strip().lower() for header in cc_delim_re.split(response.get("Vary", "")) if header.strip()}
+    return vary <= _IGNORED_VARY
+
+
+class PageCacheMiddleware:
+    """Serves and stores whole pages for anonymous visitors (see above)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _cacheable_request(request):
+            return self.get_response(request)
+
+        key = _page_key(request)
+        response = self.cached_response(request, key)
+        if response is not None:
+            _record("hits")
+            return response
+
+        request._page_cache_key = key
+        response = self.get_response(request)
+        tags = getattr(request, "_page_cache_tags", None)
+        if tags is not None:
+            _record("misses")
+            if _storable(request, response):
+                self.store(key, response, tags)
+                response["X-Page-Cache"] = "miss"
+        return response
+
+    def cached_response(self, request, key):
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        status, headers, content, tags = entry
+        if tags and _tag_versions(tags) != tags:
+            return None
+
+        response = HttpResponse(content, status=status)
+        for header, value in headers:
+            response[header] = value
+        response["X-Page-Cache"] = "hit"
+        # The browser may already have this exact page
+        last_modified = parse_http_date_safe(response.get("Last-Modified", ""))
+        return get_conditional_response(
+            request, etag=response.get("ETag"), last_modified=last_modified, response=response
+        )
+
+    def store(self, key, response, tags):
+        headers = [(header, value) for header, value in response.items() if header != "X-Page-Cache"]
+        cache.set(key, (response.status_code, headers, response.content, tags), page_cache_timeout())
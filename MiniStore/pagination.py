@@ -0,0 +1,166 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+# ---------------------------------------------------------
+#                   KEYSET (CURSOR) PAGINATION
+# ---------------------------------------------------------
+# Django's Paginator needs a COUNT(*) and an OFFSET, so deep pages get slower as
+# the catalog grows. Keyset pagination instead remembers the sort key of the
+# last row shown and asks for rows "after" it, which the (name, id) ordering
+# can answer straight from the index no matter how deep the page is.
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Dates/decimals as strings the ORM parses back. Keeps full microseconds,
+    which DjangoJSONEncoder trims and a keyset comparison cannot lose."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps([direction, list(values)], separators=(",", ":"), cls=CursorEncoder).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, field_count):
+    """Return (direction, values), or None for a missing/garbled token."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        direction, values = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list) or len(values) != field_count:
+        return None
+    return direction, values
+
+
+def _after(ordering, values, reverse=False):
+    """
+    Rows that come after ``values`` in ``ordering`` (before them if ``reverse``),
+    i.e. a lexicographic (f1, f2, ...) > (v1, v2, ...) as a Q object.
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        descending = field.startswith("-")
+        lookup = "lt" if descending != reverse else "gt"
+        step = Q(**{f"{field.lstrip('-')}__{lookup}": values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values[:i]):
+            step &= Q(**{prev_field.lstrip("-"): prev_value})
+        condition |= step
+    return condition
+
+
+def _flip(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator. Iterates like a Django Page, minus the counts."""
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by a unique sort key (default: name, id). Fields may be
+    prefixed with "-" for descending order; every field must be an attribute of
+    the rows, so order by an annotation rather than a related lookup.
+
+    ``page(cursor)`` runs one LIMIT query and never counts the table.
+    """
+
+    def __init__(self, queryset, per_page, ordering=("name", "id")):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+
+    def _key(self, obj):
+        return [getattr(obj, field.lstrip("-")) for field in self.ordering]
+
+    def _field(self, name):
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.queryset.model._meta.get_field(name)
+
+    def _clean(self, values):
+        """Cursor values as their ordering fields' Python types, or None if a value cannot be one."""
+        cleaned = []
+        for field, value in zip(self.ordering, values):
+            # The sort key is unique and never NULL; anything else came from a tampered token
+            if value is None or isinstance(value, (list, dict)):
+                return None
+            try:
+                cleaned.append(self._field(field.lstrip("-")).to_python(value))
+            except (ValidationError, TypeError, ValueError):
+                return None
+        return cleaned
+
+    def page(self, cursor=None):
+        decoded = decode_cursor(cursor, len(self.ordering))
+        qs = self.queryset
+
+        direction, values = decoded if decoded is not None else (NEXT, None)
+        if values is not None:
+            values = self._clean(values)
+            if values is None:
+                direction = NEXT  # an invalid cursor shows the first page
+
+        if direction == NEXT:
+            if values is not None:
+                qs = qs.filter(_after(self.ordering, values))
+            qs = qs.order_by(*self.ordering)
+        else:
+            qs = qs.filter(_after(self.ordering, values, reverse=True))
+            qs = qs.order_by(*[_flip(field) for field in self.ordering])
+
+        rows = list(qs[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+
+        if direction == NEXT:
+            has_next, has_previous = has_more, values is not None
+        else:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+
+        next_cursor = encode_cursor(NEXT, self._key(rows[-1])) if rows and has_next else None
+        previous_cursor = encode_cursor(PREVIOUS, self._key(rows[0])) if rows and has_previous else None
+        return KeysetPage(rows, has_next, has_previous, next_cursor, previous_cursor)
@@ -0,0 +1,238 @@
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .metrics import RequestStats
+
+# ---------------------------------------------------------
+#                   ON-DEMAND SAMPLING PROFILER
+# ---------------------------------------------------------
+# ProfilingMiddleware profiles a request when
+#
+#   - a staff user asks for it, with an "X-Profile: 1" header or "?_profile=1"
+#   - or at random, for PROFILE_SAMPLE_RATE of all requests (0 = never)
+#
+# While the view and its templates run, a background thread looks at the
+# request thread's stack every PROFILE_INTERVAL seconds and counts the stacks
+# it sees. That costs the request almost nothing, unlike a tracing profiler.
+#
+# Each profile is written to PROFILE_DIR as a collapsed-stack file (one
+# "frame;frame;frame count" line per stack, for flamegraph.pl and friends) and
+# a speedscope file (open at https://www.speedscope.app), next to a small
+# metadata file. Only the newest PROFILE_KEEP profiles are kept. Staff see
+# them at /profiles/; a profiled response carries its id in X-Profile-Id.
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_PARAM = "_profile"
+
+# format: (file suffix, content type)
+FORMATS = {
+    "collapsed": (".collapsed.txt", "text/plain; charset=utf-8"),
+    "speedscope": (".speedscope.json", "application/json"),
+}
+META_SUFFIX = ".meta.json"
+
+# One profile at a time per process, so a burst of flags cannot slow a worker down
+_busy = threading.Lock()
+
+
+def profile_dir():
+    return Path(getattr(settings, "PROFILE_DIR", Path(settings.BASE_DIR) / "profiles"))
+
+
+def profile_keep():
+    return getattr(settings, "PROFILE_KEEP", 50)
+
+
+def profile_interval():
+    return getattr(settings, "PROFILE_INTERVAL", 0.005)
+
+
+def sample_rate():
+    return getattr(settings, "PROFILE_SAMPLE_RATE", 0)
+
+
+def _frame_label(code):
+    """(function, file, first line); library files are shortened to their package path."""
+    filename = code.co_filename
+    if "site-packages" in filename:
+        filename = filename.rsplit("site-packages", 1)[1].lstrip("/\\")
+    else:
+        try:
+            filename = str(Path(filename).relative_to(settings.BASE_DIR))
+        except ValueError:
+            pass
+    return code.co_name, filename, code.co_firstlineno
+
+
+class StackSampler:
+    """Counts the stacks of one thread, sampled from a background thread, below a given frame."""
+
+    def __init__(self, thread_id, root, interval):
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks = Counter()  # (frame label, ...) outermost first -> samples
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+
+def collapsed(stacks):
+    """Brendan Gregg's collapsed format: "outer;inner;innermost count" per stack."""
+    lines = [
+        ";".join(f"{name} ({filename}:{line})" for name, filename, line in stack) + f" {count}"
+        for stack, count in sorted(stacks.items())
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def speedscope(stacks, name, interval):
+    """A speedscope "sampled" profile (https://www.speedscope.app/file-format-schema.json)."""
+    frames, index = [], {}
+    samples, weights = [], []
+    for stack, count in sorted(stacks.items()):
+        for label in stack:
+            if label not in index:
+                index[label] = len(frames)
+                frames.append({"name": label[0], "file": label[1], "line": label[2]})
+        samples.append([index[label] for label in stack])
+        weights.append(round(count * interval * 1000, 3))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "MiniStore",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled", "name": name, "unit": "milliseconds",
+            "startValue": 0, "endValue": round(sum(weights), 3),
+            "samples": samples, "weights": weights,
+        }],
+    }
+
+
+# --- ring directory ---
+
+def save_profile(stacks, meta):
+    """Write a profile's files and drop the oldest beyond PROFILE_KEEP. Returns its id."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    # Ids sort by time, which is also the ring order
+    profile_id = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:6]}"
+    name = f"{meta['method']} {meta['path']}"
+
+    (directory / (profile_id + FORMATS["collapsed"][0])).write_text(collapsed(stacks))
+    (directory / (profile_id + FORMATS["speedscope"][0])).write_text(
+        json.dumps(speedscope(stacks, name, meta["interval"]))
+    )
+    # Metadata last: a profile is listed once its files are complete
+    (directory / (profile_id + META_SUFFIX)).write_text(json.dumps({**meta, "id": profile_id}))
+
+    for old in sorted(directory.glob("*" + META_SUFFIX))[:-profile_keep() or None]:
+        delete_profile(old.name[: -len(META_SUFFIX)])
+    return profile_id
+
+
+def delete_profile(profile_id):
+    directory = profile_dir()
+    for suffix in [META_SUFFIX] + [suffix for suffix, _ in FORMATS.values()]:
+        (directory / (profile_id + suffix)).unlink(missing_ok=True)
+
+
+def recent_profiles():
+    """Metadata of the stored profiles, newest first."""
+    directory = profile_dir()
+    profiles = []
+    for path in sorted(directory.glob("*" + META_SUFFIX), reverse=True):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue  # removed or half-written by another worker
+    return profiles
+
+
+def profile_file(profile_id, fmt):
+    """Path of a stored profile file, or None if there is no such profile/format."""
+    if fmt not in FORMATS or not profile_id.replace("-", "").isalnum():
+        return None
+    path = profile_dir() / (profile_id + FORMATS[fmt][0])
+    return path if path.is_file() else None
+
+
+# --- middleware ---
+
+def wants_profile(request):
+    # Check the flag before request.user: loading the user costs queries on every request
+    if request.headers.get(PROFILE_HEADER) == "1" or request.GET.get(PROFILE_PARAM) == "1":
+        user = getattr(request, "user", None)
+        if user is not None and user.is_staff:
+            return True
+    rate = sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+class ProfilingMiddleware:
+    """Profiles flagged or sampled requests (see above); needs request.user, so runs after auth."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not wants_profile(request) or not _busy.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request)
+        finally:
+            _busy.release()
+
+    def profile(self, request):
+        interval = profile_interval()
+        stats = RequestStats()
+        sampler = StackSampler(threading.get_ident(), sys._getframe(), interval)
+        started = time.perf_counter()
+        with sampler, connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        profile_id = save_profile(sampler.stacks, {
+            "created": timezone.now().isoformat(),
+            "method": request.method,
+            "path": request.get_full_path(),
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "queries": stats.queries,
+            "sql_ms": round(stats.sql_seconds * 1000, 1),
+            "samples": sum(sampler.stacks.values()),
+            "interval": interval,
+            "user": request.user.get_username() if request.user.is_authenticated else None,
+        })
+        response["X-Profile-Id"] = profile_id
+        return response
@@ -0,0 +1,135 @@
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.template.base import Template
+
+# ---------------------------------------------------------
+#                   QUERY BUDGETS
+# ---------------------------------------------------------
+# Every URL name in urls.py has a budget: the most SQL queries one request may
+# run, and how many of them may repeat a query already run by the same
+# request (same SQL, other parameters: the usual shape of an N+1).
+#
+# QueryBudgetTests (tests.py) requests every view as the right kind of user
+# at several data sizes. It fails, listing the offending SQL with the code and
+# template that ran it, when a view goes over its budget or when its query
+# count grows with the data. A new URL without a budget fails too.
+#
+# Counts include transaction statements (SAVEPOINT/RELEASE) and session
+# writes, exactly as the view runs them.
+
+QUERY_BUDGETS = {
+    # url name: (max queries, max duplicate queries)
+    "home": (2, 0),
+    "login": (0, 0),
+    "logout": (4, 0),
+    "signup": (0, 0),
+    "seller_signup": (0, 0),
+    "profile": (8, 0),
+    "become_seller": (3, 0),
+    "cancel_seller": (5, 0),
+    "admin_dashboard": (7, 0),
+    "approve_seller": (6, 0),
+    "deny_seller": (6, 0),
+    "approve_cancellation": (6, 0),
+    "revoke_seller": (3, 0),
+    "seller_dashboard": (8, 0),
+    "product_create": (5, 0),
+    "product_update": (6, 0),
+    "product_delete": (5, 0),
+    "shop": (2, 0),
+    "product_list_by_category": (2, 0),
+    "product_detail": (2, 0),
+    "image_rendition": (0, 0),
+    "cart_detail": (5, 0),
+    "cart_add": (5, 0),
+    "cart_remove": (4, 0),
+    "cart_update": (5, 0),
+    "proceed_to_checkout": (5, 0),
+    "checkout": (5, 0),
+    "order_success": (6, 0),
+    "about": (0, 0),
+    "contact": (0, 0),
+    "notifications": (6, 0),
+    "metrics": (2, 0),
+    "request_profiles": (4, 0),
+    "request_profile_file": (2, 0),
+}
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_PROJECT_ROOT = str(Path(settings.BASE_DIR).resolve())
+_THIS_FILE = str(Path(__file__).resolve())
+
+
+def sql_shape(sql):
+    """SQL with IN (...) lists collapsed, so the same query with other parameters compares equal."""
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+def _origin():
+    """Project frames ("file:line in function") and the innermost template that ran the current query."""
+    frames, template = [], None
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_ROOT) and filename != _THIS_FILE and "site-packages" not in filename:
+            frames.append(f"{Path(filename).relative_to(_PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}")
+        elif template is None and frame.f_code.co_name == "render":
+            candidate = frame.f_locals.get("self")
+            if isinstance(candidate, Template):
+                template = candidate.name
+        frame = frame.f_back
+    return frames[::-1], template
+
+
+class QueryRecorder:
+    """Records every query run on a connection, with the code that ran it (a connection execute_wrapper)."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.queries = []  # (sql, project frames, template)
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._wrapper.__exit__(*exc_info)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, *_origin()))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    @property
+    def duplicates(self):
+        """Queries repeating the shape of an earlier query of the same request."""
+        return len(self.queries) - len({sql_shape(sql) for sql, _, _ in self.queries})
+
+    def over_budget(self, budget):
+        max_queries, max_duplicates = budget
+        return len(self) > max_queries or self.duplicates > max_duplicates
+
+    def report(self, limit=8):
+        """The recorded queries grouped by shape, most repeated first, each with where it came from."""
+        shapes = Counter(sql_shape(sql) for sql, _, _ in self.queries)
+        first = {}
+        for sql, frames, template in self.queries:
+            first.setdefault(sql_shape(sql), (frames, template))
+
+        lines = []
+        for shape, count in shapes.most_common(limit):
+            frames, template = first[shape]
+            lines.append(f"  {count}x {shape}")
+            lines.extend(f"        {frame}" for frame in frames[-4:])
+            if template:
+                lines.append(f"        template {template}")
+        if len(shapes) > limit:
+            lines.append(f"  ... and {len(shapes) - limit} more")
+        return "\n".join(lines)
@@ -0,0 +1,156 @@
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.encoding import filepath_to_uri
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .middleware import parse_accept
+
+# ---------------------------------------------------------
+#                   IMAGE RENDITIONS
+# ---------------------------------------------------------
+# Product photos are uploaded at full resolution. Pages ask for a resized copy
+# instead:
+#
+#   /media/r/<w>x<h>/<path>    e.g. /media/r/480x0/products/2025/01/02/dress.jpg
+#
+# "WxH" crops to exactly that box (thumbnails); "Wx0" scales to width W and
+# keeps the aspect ratio. Only the sizes below are served, so nobody can make
+# the server render arbitrary sizes. Browsers that accept WebP get WebP,
+# the rest get JPEG. Results are cached on disk under MEDIA_ROOT/r/, next to
+# the URL path, so a front-end web server can serve cached files directly.
+
+RENDITION_DIR = "r"
+
+ALLOWED_SIZES = {
+    (40, 40), (80, 80), (60, 60), (120, 120), (100, 100), (200, 200),
+    (320, 0), (480, 0), (640, 0), (960, 0), (1280, 0),
+}
+
+# srcset presets used by {% product_image %}: candidate renditions and, for
+# fluid images, the `sizes` attribute. Presets without `sizes` are fixed-size
+# thumbnails and get density (1x/2x) descriptors instead of widths.
+PRESETS = {
+    "thumb": {"candidates": [(40, 40), (80, 80)]},
+    "small": {"candidates": [(60, 60), (120, 120)]},
+    "cart": {"candidates": [(100, 100), (200, 200)]},
+    "card": {
+        "candidates": [(320, 0), (480, 0), (640, 0)],
+        "sizes": "(max-width: 477px) 100vw, (max-width: 799px) 45vw, 300px",
+    },
+    "detail": {
+        "candidates": [(480, 0), (640, 0), (960, 0), (1280, 0)],
+        "sizes": "(max-width: 799px) 100vw, 40vw",
+    },
+}
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+
+
+class RenditionError(Exception):
+    """The requested rendition is not allowed or its source image is missing."""
+
+
+def rendition_url(path, width, height):
+    return f"{settings.MEDIA_URL}{RENDITION_DIR}/{width}x{height}/{filepath_to_uri(path)}"
+
+
+def pick_format(accept_header):
+    # Only an explicit image/webp counts: browsers without WebP support send */* too
+    return "webp" if parse_accept(accept_header).get("image/webp", 0) > 0 else "jpeg"
+
+
+def source_path(path):
+    """Absolute path of an uploaded image, refusing anything outside MEDIA_ROOT."""
+    parts = Path(path).parts
+    if not parts or parts[0] == RENDITION_DIR or Path(path).suffix.lower() not in SOURCE_EXTENSIONS:
+        raise RenditionError(f"Not an uploaded image: {path}")
+    try:
+        full = Path(safe_join(settings.MEDIA_ROOT, path))
+    except SuspiciousFileOperation:
+        raise RenditionError(f"Path outside MEDIA_ROOT: {path}")
+    if not full.is_file():
+        raise RenditionError(f"No such image: {path}")
+    return full
+
+
+def cache_path(path, width, height, fmt):
+    return Path(settings.MEDIA_ROOT) / RENDITION_DIR / f"{width}x{height}" / f"{path}.{fmt}"
+
+
+def _resize(image, width, height):
+    image = ImageOps.exif_transpose(image)
+    if height:
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    if image.width <= width:
+        return image.copy()
+    return image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+
+
+def get_rendition(path, width, height, fmt="jpeg"):
+    """
+    Path of the cached rendition, rendering it first if it is missing or
+    older than the source. Raises RenditionError for disallowed requests.
+    """
+    if (width, height) not in ALLOWED_SIZES:
+        raise RenditionError(f"Size {width}x{height} is not allowed")
+    source = source_path(path)
+    target = cache_path(path, width, height, fmt)
+
+    if target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+        return target
+
+    pil_format, _, options = FORMATS[fmt]
+    try:
+        with Image.open(source) as image:
+            resized = _resize(image, width, height)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+        # OSError: truncated or otherwise corrupt files fail while decoding
+        raise RenditionError(f"Cannot render {path}: {exc}")
+    if pil_format == "JPEG" and resized.mode != "RGB":
+        resized = resized.convert("RGB")
+
+    # Write to a temp file in the same directory and rename over the target, so
+    # concurrent requests never see (or serve) a half-written file
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-", suffix=f".{fmt}")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            resized.save(out, pil_format, **options)
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return target
+
+
+def srcset(path, preset):
+    """(src, srcset, sizes) attribute values for an uploaded image and a PRESETS name."""
+    spec = PRESETS[preset]
+    candidates = spec["candidates"]
+    if "sizes" in spec:
+        entries = [f"{rendition_url(path, w, h)} {w}w" for w, h in candidates]
+        # Fallback for browsers without srcset: a mid-sized copy
+        src = rendition_url(path, *candidates[len(candidates) // 2])
+    else:
+        entries = [f"{rendition_url(path, w, h)} {i + 1}x" for i, (w, h) in enumerate(candidates)]
+        src = rendition_url(path, *candidates[0])
+    return src, ", ".join(entries), spec.get("sizes", "")
+
+
+def pregenerate(path, presets=None, formats=("webp", "jpeg")):
+    """Render every preset size of one image. Returns how many renditions exist afterwards."""
+    sizes = {size for name in (presets or PRESETS) for size in PRESETS[name]["candidates"]}
+    for width, height in sizes:
+        for fmt in formats:
+            get_rendition(path, width, height, fmt)
+    return len(sizes) * len(formats)
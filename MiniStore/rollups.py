@@ -0,0 +1,153 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import CategoryDailySales, Order, OrderItem, ProductDailySales, RollupWatermark, SellerDailySales
+
+# ---------------------------------------------------------
+#                   DAILY SALES ROLLUPS
+# ---------------------------------------------------------
+# Reporting reads small pre-aggregated tables (one row per key per day)
+# instead of scanning the order history:
+#
+#   ProductDailySales / SellerDailySales / CategoryDailySales
+#       day, orders, units, revenue
+#
+# `manage.py refresh_rollups` folds in orders placed since the stored
+# watermark (highest order id already processed). Every day touched by a new
+# order is recomputed whole, so re-running is harmless. Orders younger than
+# ``settle`` seconds are left for the next run, giving checkouts still in
+# flight time to commit. `--rebuild` recomputes everything from scratch,
+# e.g. after orders were edited or deleted in the admin.
+#
+# Rows are keyed by the product's *current* seller and category.
+
+WATERMARK = "daily_sales"
+
+# (rollup model, its key field, the OrderItem path that feeds it)
+ROLLUPS = (
+    (ProductDailySales, "product", "product_id"),
+    (SellerDailySales, "seller", "product__created_by"),
+    (CategoryDailySales, "category", "product__category_id"),
+)
+
+
+def _recompute(up_to_order_id, days=None):
+    """Rewrite rollup rows for ``days`` (all days if None) from orders up to the given id."""
+    lines = OrderItem.objects.filter(order_id__lte=up_to_order_id)
+    if days is not None:
+        lines = lines.filter(order__created__date__in=days)
+    lines = lines.annotate(day=TruncDate("order__created")).order_by()
+
+    written = 0
+    for model, field, source in ROLLUPS:
+        stale = model.objects.all() if days is None else model.objects.filter(day__in=days)
+        stale.delete()
+
+        rows = (
+            lines.exclude(**{f"{source}__isnull": True})
+            .values("day", source)
+            .annotate(
+                n_orders=Count("order", distinct=True),
+                n_units=Sum("quantity"),
+                amount=Sum(F("price") * F("quantity"), output_field=DecimalField(max_digits=14, decimal_places=2)),
+            )
+        )
+        created = model.objects.bulk_create(
+            [
+                model(day=row["day"], orders=row["n_orders"], units=row["n_units"], revenue=row["amount"],
+                      **{f"{field}_id": row[source]})
+                for row in rows
+            ],
+            batch_size=500,
+        )
+        written += len(created)
+    return written
+
+
+def refresh_rollups(settle=60):
+    """Fold orders newer than the watermark into the rollups. Returns the number of new orders."""
+    cutoff = timezone.now() - timedelta(seconds=settle)
+    with transaction.atomic():
+        mark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        new_orders = Order.objects.filter(pk__gt=mark.last_order_id, created__lte=cutoff)
+        up_to = new_orders.aggregate(last=Max("pk"))["last"]
+        if up_to is None:
+            return 0
+
+        new_orders = new_orders.filter(pk__lte=up_to)
+        count = new_orders.count()
+        days = set(new_orders.annotate(day=TruncDate("created")).values_list("day", flat=True))
+        _recompute(up_to, days)
+
+        mark.last_order_id = up_to
+        mark.save(update_fields=["last_order_id", "updated"])
+    return count
+
+
+def rebuild_rollups(settle=60):
+    """Recompute every rollup row from the full order history. Returns rows written."""
+    cutoff = timezone.now() - timedelta(seconds=settle)
+    with transaction.atomic():
+        mark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        up_to = Order.objects.filter(created__lte=cutoff).aggregate(last=Max("pk"))["last"] or 0
+        written = _recompute(up_to)
+        mark.last_order_id = up_to
+        mark.save(update_fields=["last_order_id", "updated"])
+    return written
+
+
+# ---------------------------------------------------------
+#                   READING ROLLUPS
+# ---------------------------------------------------------
+
+
+def daily_series(rows, days=30, today=None):
+    """
+    Turn rollup rows into one entry per day for the last ``days`` days
+    (missing days filled with zeros), each with ``pct`` of the busiest day
+    for simple bar charts.
+    """
+    today = today or timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    by_day = {row.day: row for row in rows if start <= row.day <= today}
+    peak = max((row.revenue for row in by_day.values()), default=0)
+
+    series = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = by_day.get(day)
+        revenue = row.revenue if row else 0
+        series.append({
+            "day": day,
+            "orders": row.orders if row else 0,
+            "units": row.units if row else 0,
+            "revenue": revenue,
+            "pct": int(revenue * 100 / peak) if peak else 0,
+        })
+    return series
+
+
+def seller_recent_sales(seller, days=30):
+    """Daily series plus totals for a seller's last ``days`` days, from at most ``days`` rows."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    series = daily_series(SellerDailySales.objects.filter(seller=seller, day__gte=since), days)
+    return {
+        "series": series,
+        "units": sum(day["units"] for day in series),
+        "revenue": sum((day["revenue"] for day in series), 0),
+    }
+
+
+def top_categories(days=30, limit=5):
+    """Best-selling categories by revenue over the last ``days`` days."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        CategoryDailySales.objects.filter(day__gte=since)
+        .values("category__name")
+        .annotate(revenue=Sum("revenue"), units=Sum("units"), orders=Sum("orders"))
+        .order_by("-revenue")[:limit]
+    )
@@ -0,0 +1,142 @@
+import re
+
+from django.db import OperationalError, connections
+
+from .models import Product
+
+# ---------------------------------------------------------
+#                   FULL-TEXT PRODUCT SEARCH
+# ---------------------------------------------------------
+# Products are indexed in an SQLite FTS5 virtual table keyed on the product id
+# (the FTS rowid). Searches join against it and are ordered by bm25 relevance.
+# On other database backends, or when SQLite was built without FTS5, searching
+# falls back to the old ``name__icontains`` filter.
+
+FTS_TABLE = "MiniStore_product_fts"
+
+# bm25 column weights: name, description, category name
+FTS_WEIGHTS = (10.0, 1.0, 5.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Per-alias cache of "does the FTS table exist on this connection"
+_fts_ready = {}
+
+
+def create_fts_table(connection):
+    """Create the FTS5 table. Returns False if this backend cannot host it."""
+    if connection.vendor != "sqlite":
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABLE}" USING fts5('
+                "name, description, category, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+    except OperationalError:
+        # SQLite compiled without FTS5
+        return False
+    _fts_ready.pop(connection.alias, None)
+    return True
+
+
+def forget_fts_state():
+    """Look for the FTS table again (after migrations created or dropped it)."""
+    _fts_ready.clear()
+
+
+def fts_enabled(using="default"):
+    """True when the FTS index table exists on the given database."""
+    if using not in _fts_ready:
+        connection = connections[using]
+        _fts_ready[using] = (
+            connection.vendor == "sqlite"
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_ready[using]
+
+
+def rebuild_index(using="default"):
+    """Re-populate the whole index from the product table. Returns row count (0 without an index)."""
+    if not fts_enabled(using):
+        return 0
+    connection = connections[using]
+    product_table = Product._meta.db_table
+    category_table = Product._meta.get_field("category").related_model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}"')
+        cursor.execute(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, name, description, category) '
+            f'SELECT p."id", p."name", p."description", COALESCE(c."name", \'\') '
+            f'FROM "{product_table}" p LEFT JOIN "{category_table}" c ON c."id" = p."category_id"'
+        )
+        cursor.execute(f'SELECT COUNT(*) FROM "{FTS_TABLE}"')
+        return cursor.fetchone()[0]
+
+
+def index_product(product, using="default"):
+    """Insert or refresh one product's row in the index."""
+    if not fts_enabled(using):
+        return
+    category_name = product.category.name if product.category_id else ""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [product.pk])
+        cursor.execute(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, name, description, category) VALUES (%s, %s, %s, %s)',
+            [product.pk, product.name, product.description, category_name],
+        )
+
+
+def reindex_category(category, using="default"):
+    """Refresh the category name of every indexed product in ``category`` in one statement."""
+    if not fts_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'UPDATE "{FTS_TABLE}" SET category = %s '
+            f'WHERE rowid IN (SELECT "id" FROM "{Product._meta.db_table}" WHERE "category_id" = %s)',
+            [category.name, category.pk],
+        )
+
+
+def unindex_product(product_id, using="default"):
+    if not fts_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [product_id])
+
+
+def build_match_expression(query):
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term ("dre"* matches "dress"), and terms
+    are implicitly AND-ed. Returns '' when the query has no searchable words.
+    """
+    tokens = _TOKEN_RE.findall(query or "")
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_products(queryset, query):
+    """
+    Filter a Product queryset by a search query, best matches first.
+
+    Uses the FTS index when available (annotating ``search_rank``), otherwise
+    the plain ``name__icontains`` filter.
+    """
+    expression = build_match_expression(query)
+    if not expression or not fts_enabled(queryset.db):
+        return queryset.filter(name__icontains=query)
+
+    product_table = Product._meta.db_table
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    return queryset.extra(
+        select={"search_rank": f'bm25("{FTS_TABLE}", {weights})'},
+        tables=[FTS_TABLE],
+        where=[
+            f'"{FTS_TABLE}".rowid = "{product_table}"."id"',
+            f'"{FTS_TABLE}" MATCH %s',
+        ],
+        params=[expression],
+    ).order_by("search_rank", "name", "id")
@@ -0,0 +1,214 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import search
+from .catalog import bump_catalog_version
+from .models import Category, Order, OrderItem, Product, UserProfile
+from .pagecache import purge_tags
+from .rollups import rebuild_rollups
+
+# ---------------------------------------------------------
+#                   SYNTHETIC STORE DATA
+# ---------------------------------------------------------
+# `python manage.py seed_store` (and the benchmark runner) fill the database
+# with a store of any size, inserted with bulk_create in batches. The same
+# seed always produces the same store. Volumes follow the long tails of a
+# real marketplace rather than uniform noise:
+#
+#   - a few percent of users are sellers; product counts per seller, orders
+#     per customer and sales per product follow Zipf-like curves
+#   - some categories are much larger than others
+#   - orders are spread over the last year, oldest first, 1-5 lines each
+#
+# Seeded rows are recognisable by SEED_PREFIX (usernames, product slugs) so
+# they can be removed again with clear_seeded().
+
+SEED_PREFIX = "seed-"
+SEED_PASSWORD = "seed-pass-123"
+
+CATEGORIES = (
+    # (name, relative size, product noun)
+    ("Dresses", 18, "Dress"), ("Tops", 16, "Top"), ("Shoes", 12, "Sneaker"), ("Bags", 10, "Tote"),
+    ("Accessories", 9, "Belt"), ("Skirts", 8, "Skirt"), ("Outerwear", 7, "Jacket"), ("Jewelry", 6, "Necklace"),
+    ("Activewear", 5, "Legging"), ("Swimwear", 4, "Swimsuit"), ("Hats", 3, "Hat"), ("Scarves", 2, "Scarf"),
+)
+ADJECTIVES = ("Classic", "Everyday", "Vintage", "Relaxed", "Tailored", "Soft", "Summer", "Cropped", "Oversized", "Slim")
+COLORS = ("Black", "Ivory", "Navy", "Olive", "Blush", "Camel", "Denim", "Red", "Sage", "Grey")
+
+SELLER_SHARE = 0.02
+PENDING_SHARE = 0.005
+ITEMS_PER_ORDER = ((1, 45), (2, 25), (3, 15), (4, 10), (5, 5))  # (lines, weight)
+HISTORY_DAYS = 365
+
+
+class SeedError(Exception):
+    """The database already holds seeded rows (clear them first)."""
+
+
+def _zipf_cum_weights(n, exponent):
+    return list(accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+
+def _long_tail(rng, population, exponent, k):
+    """k draws from population, a few members getting most of them (order shuffled first)."""
+    population = list(population)
+    rng.shuffle(population)
+    return rng.choices(population, cum_weights=_zipf_cum_weights(len(population), exponent), k=k)
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Let bulk_create keep the created/updated values we set (auto_now fields would overwrite them)."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _batched(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def clear_seeded():
+    """Delete seeded users (with their orders/profiles) and products. Returns rows deleted."""
+    with transaction.atomic():
+        deleted, _ = Order.objects.filter(user__username__startswith=SEED_PREFIX).delete()
+        deleted += Product.objects.filter(slug__startswith=SEED_PREFIX).delete()[0]
+        deleted += User.objects.filter(username__startswith=SEED_PREFIX).delete()[0]
+    search.rebuild_index()
+    bump_catalog_version()
+    purge_tags("catalog")
+    rebuild_rollups(settle=0)
+    return deleted
+
+
+def seed_store(products=1000, users=500, order_items=5000, seed=42, batch_size=2000, progress=None):
+    """Insert a synthetic store (see above). Returns the number of rows created per model."""
+    if users < 2 or products < 1:
+        raise SeedError("A store needs at least 2 users (a seller and a customer) and 1 product.")
+    if User.objects.filter(username__startswith=SEED_PREFIX).exists():
+        raise SeedError("The database already holds seeded data; clear it first (seed_store --clear).")
+
+    rng = random.Random(seed)
+    now = timezone.now().replace(microsecond=0)
+    report = progress or (lambda message: None)
+    counts = {}
+
+    with transaction.atomic(), _explicit_timestamps(Product, Order):
+        # --- categories (existing ones with the same slug are reused) ---
+        categories = []
+        for name, _, _ in CATEGORIES:
+            category, _ = Category.objects.get_or_create(slug=name.lower(), defaults={"name": name})
+            categories.append(category)
+
+        # --- users: shoppers, a few sellers, a handful waiting for approval ---
+        password = make_password(SEED_PASSWORD)
+        user_rows = [
+            User(
+                username=f"{SEED_PREFIX}user{i:06d}", email=f"user{i}@example.com", password=password,
+                first_name=rng.choice(COLORS), last_name=f"Shopper{i}",
+                date_joined=now - timedelta(days=rng.randrange(HISTORY_DAYS)),
+            )
+            for i in range(users)
+        ]
+        created_users = []
+        for batch in _batched(user_rows, batch_size):
+            created_users += User.objects.bulk_create(batch)
+        n_sellers = min(users - 1, max(1, round(users * SELLER_SHARE)))
+        n_pending = round(users * PENDING_SHARE)
+        sellers, customers = created_users[:n_sellers], created_users[n_sellers:]
+        profiles = [
+            UserProfile(user=user, role="SELLER", seller_status="APPROVED", city="Manila") for user in sellers
+        ] + [
+            UserProfile(user=user, role="CUSTOMER", seller_status="PENDING" if i < n_pending else "NONE",
+                        address=f"{i} Seed Street", postal_code="1000", city="Manila")
+            for i, user in enumerate(customers)
+        ]
+        for batch in _batched(profiles, batch_size):
+            UserProfile.objects.bulk_create(batch)
+        counts["users"] = len(created_users)
+        report(f"{len(created_users)} users ({len(sellers)} sellers)")
+
+        # --- products: long-tailed over sellers and categories ---
+        owners = _long_tail(rng, sellers, 1.1, products)
+        kinds = rng.choices(range(len(CATEGORIES)), weights=[weight for _, weight, _ in CATEGORIES], k=products)
+        product_rows = []
+        for i in range(products):
+            category, noun = categories[kinds[i]], CATEGORIES[kinds[i]][2]
+            stock = 0 if rng.random() < 0.08 else min(500, int(rng.paretovariate(1.2) * 5))
+            created = now - timedelta(days=rng.randrange(HISTORY_DAYS), seconds=rng.randrange(86400))
+            product_rows.append(Product(
+                category=category, created_by=owners[i],
+                name=f"{rng.choice(ADJECTIVES)} {rng.choice(COLORS)} {noun} {i}",
+                slug=f"{SEED_PREFIX}{i:07d}",
+                description=f"Synthetic product {i} in {category.name}.",
+                price=Decimal(f"{rng.lognormvariate(6.2, 0.6):.2f}"),
+                stock=stock, available=stock > 0,
+                created=created, updated=created,
+            ))
+        created_products = []
+        for batch in _batched(product_rows, batch_size):
+            created_products += Product.objects.bulk_create(batch)
+        counts["products"] = len(created_products)
+        report(f"{len(created_products)} products in {len(categories)} categories")
+
+        # --- orders and their lines, oldest first so ids grow with time ---
+        sizes, size_weights = zip(*ITEMS_PER_ORDER)
+        order_sizes, planned = [], 0
+        while planned < order_items:
+            order_sizes.append(min(order_items - planned, rng.choices(sizes, size_weights)[0]))
+            planned += order_sizes[-1]
+        n_orders = len(order_sizes)
+        buyers = _long_tail(rng, customers, 0.8, n_orders)
+        stamps = sorted(now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400)) for _ in range(n_orders))
+        popularity = list(created_products)
+        rng.shuffle(popularity)
+        product_cum = _zipf_cum_weights(len(popularity), 0.9)
+
+        counts["orders"] = counts["order_items"] = 0
+        for start in range(0, n_orders, batch_size):
+            orders, lines = [], []
+            for i in range(start, min(start + batch_size, n_orders)):
+                picked = rng.choices(popularity, cum_weights=product_cum, k=order_sizes[i])
+                quantities = [rng.choice((1, 1, 1, 2, 3)) for _ in picked]
+                buyer = buyers[i]
+                orders.append(Order(
+                    user=buyer, first_name=buyer.first_name, last_name=buyer.last_name, email=buyer.email,
+                    address="1 Seed Street", postal_code="1000", city="Manila", paid=True,
+                    total=sum(product.price * qty for product, qty in zip(picked, quantities)),
+                    item_count=sum(quantities), created=stamps[i], updated=stamps[i],
+                ))
+                lines.append(list(zip(picked, quantities)))
+            created_orders = Order.objects.bulk_create(orders)
+            items = [
+                OrderItem(order=order, product=product, price=product.price, quantity=quantity)
+                for order, order_lines in zip(created_orders, lines) for product, quantity in order_lines
+            ]
+            OrderItem.objects.bulk_create(items, batch_size=batch_size)
+            counts["orders"] += len(created_orders)
+            counts["order_items"] += len(items)
+            report(f"{counts['orders']} orders, {counts['order_items']} order items")
+
+    # bulk_create sends no signals: refresh everything the signals would have
+    search.rebuild_index()
+    bump_catalog_version()
+    purge_tags("catalog")
+    rebuild_rollups(settle=0)
+    return counts
@@ -1,29 +1,97 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from .models import Order, OrderItem, Notification, Product
-
-# 1. Notify Customer when they place an Order
-@receiver(post_save, sender=Order)
-def notify_customer_on_order(sender, instance, created, **kwargs):
-    if created and instance.user:
-        Notification.objects.create(
-            recipient=instance.user,
-            message=f"Order #{instance.id} placed successfully! We are processing it.",
-            order=instance
-        )
-
-# 2. Notify Seller when their specific Product is sold
-@receiver(post_save, sender=OrderItem)
-def notify_seller_on_item_sold(sender, instance, created, **kwargs):
-    if created:
-        product = instance.product
-        seller = product.created_by
-        
-        # Only notify if the product has a seller and the seller is not buying their own item
-        if seller and seller != instance.order.user:
-            Notification.objects.create(
-                recipient=seller,
-                message=f"You made a sale! {instance.quantity}x {product.name} was purchased.",
-                order=instance.order
-            )
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate, post_save, post_delete, pre_save
+from django.dispatch import Signal, receiver
+from .models import Product, Category, Notification
+from . import search
+from .database import configure_connection
+from .fragments import invalidate_product_cards
+from .catalog import bump_catalog_version
+from .pagecache import purge_products, purge_tags
+from .cart import merge_session_cart
+from .tasks import notify_order_placed
+from .notifications import increment_unread
 
+# 1. Notify the Customer and each Seller once per order, off the request path
+# (checkout sends order_placed after the items exist)
+order_placed = Signal()  # kwargs: order, items
+
+@receiver(order_placed)
+def queue_order_notifications(sender, order, items, **kwargs):
+    notify_order_placed.delay(order.id)
+
+# 2. Keep the search index and cached product cards in sync with the catalog
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, using, **kwargs):
+    search.index_product(instance, using=using)
+    invalidate_product_cards([instance.pk])
+
+@receiver(post_delete, sender=Product)
+def unindex_product_on_delete(sender, instance, using, **kwargs):
+    search.unindex_product(instance.pk, using=using)
+    invalidate_product_cards([instance.pk])
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, using, **kwargs):
+    # Category names are indexed too, so a rename touches every product in it
+    if not created:
+        search.reindex_category(instance, using=using)
+        # Product cards show the category name
+        invalidate_product_cards(list(instance.products.using(using).values_list("pk", flat=True)))
+
+@receiver(post_migrate)
+def recheck_search_index(sender, **kwargs):
+    # Migrations may have created or dropped the FTS table
+    search.forget_fts_state()
+
+# 3. Category list / per-category product counts changed
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_catalog_metadata(sender, using, **kwargs):
+    # After commit: bumped earlier, a concurrent reader could cache the old rows under the new version
+    transaction.on_commit(bump_catalog_version, using=using)
+
+# 4. Purge cached anonymous pages showing the changed product / category
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def purge_product_pages(sender, instance, using, **kwargs):
+    # After commit, so a page rendered meanwhile from the old rows is not stored as current
+    transaction.on_commit(lambda: purge_products([instance.pk]), using=using)
+
+@receiver(pre_save, sender=Category)
+def remember_category_slug(sender, instance, **kwargs):
+    # Product pages are tagged with the slug they were rendered with, which a rename replaces
+    if instance.pk:
+        instance._old_slug = Category.objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def purge_category_pages(sender, instance, using, **kwargs):
+    slugs = {instance.slug, getattr(instance, "_old_slug", None)} - {None}
+    transaction.on_commit(lambda: purge_tags("catalog", *(f"category:{slug}" for slug in slugs)), using=using)
+
+# 5. Carry a pre-login session cart over into the saved cart
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is not None and getattr(settings, "CART_BACKEND", "session") == "database":
+        merge_session_cart(request, user)
+
+# 6. Keep UserProfile.unread_notifications in step (bulk paths use notifications.bulk_notify)
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        increment_unread({instance.recipient_id: 1})
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        increment_unread({instance.recipient_id: -1})
+
+# 7. WAL, busy timeout and cache pragmas on every new SQLite connection
+@receiver(connection_created)
+def tune_new_connection(sender, connection, **kwargs):
+    configure_connection(connection)
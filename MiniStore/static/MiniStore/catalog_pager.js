@@ -0,0 +1,58 @@
+// "Load more" / infinite scroll for cursor-paginated catalog grids.
+// Fetches the next page's HTML, appends its product cards to the matching
+// [data-keyset-grid] containers and swaps in the new pager.
+(function () {
+    function loadMore(link) {
+        if (link.dataset.loading) return;
+        link.dataset.loading = "1";
+
+        fetch(link.href, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(response => response.text())
+            .then(html => {
+                const doc = new DOMParser().parseFromString(html, 'text/html');
+                const grids = document.querySelectorAll('[data-keyset-grid]');
+                const newGrids = doc.querySelectorAll('[data-keyset-grid]');
+
+                grids.forEach((grid, i) => {
+                    if (!newGrids[i]) return;
+                    newGrids[i].querySelectorAll('.pro').forEach(card => grid.appendChild(card));
+                });
+
+                const pager = document.querySelector('[data-keyset-pager]');
+                const newPager = doc.querySelector('[data-keyset-pager]');
+                if (newPager) {
+                    pager.replaceWith(newPager);
+                    watch(newPager);
+                } else {
+                    pager.remove();
+                }
+                history.replaceState(null, '', link.href);
+            })
+            .catch(() => { window.location.href = link.href; });
+    }
+
+    function watch(pager) {
+        const link = pager.querySelector('[data-load-more]');
+        if (!link) return;
+
+        link.addEventListener('click', function (e) {
+            e.preventDefault();
+            loadMore(link);
+        });
+
+        if ('infinite' in pager.dataset && 'IntersectionObserver' in window) {
+            const observer = new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) {
+                    observer.disconnect();
+                    loadMore(link);
+                }
+            });
+            observer.observe(link);
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        const pager = document.querySelector('[data-keyset-pager]');
+        if (pager) watch(pager);
+    });
+})();
@@ -0,0 +1,170 @@
+import gzip
+import logging
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz siblings are written without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+#                   STATIC ASSET PIPELINE
+# ---------------------------------------------------------
+# `python manage.py collectstatic` with this storage:
+#   1. minifies CSS/JS as they are copied into STATIC_ROOT,
+#   2. writes content-hashed copies (style.3f2a9c1b.css) and staticfiles.json,
+#      and rewrites url() references inside CSS to the hashed names,
+#   3. writes .gz (and .br if the `brotli` package is installed) next to
+#      every compressible file when that actually saves bytes.
+# PrecompressedStaticMiddleware (middleware.py) then serves those files.
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".html", ".map", ".ico")
+MIN_COMPRESS_SIZE = 256
+
+
+_CSS_STRING = r""""(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'"""
+_CSS_STRINGS = re.compile(f"({_CSS_STRING})")
+_CSS_COMMENTS_OR_STRINGS = re.compile(rf"/\*.*?\*/|{_CSS_STRING}", re.S)
+
+
+def _squeeze_css(css):
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}")
+
+
+def minify_css(css):
+    """Conservative CSS minifier: drops comments and redundant whitespace, never touches strings."""
+    css = _CSS_COMMENTS_OR_STRINGS.sub(lambda m: "" if m.group(0).startswith("/*") else m.group(0), css)
+    parts = _CSS_STRINGS.split(css)
+    # re.split keeps the captured strings at odd positions
+    return "".join(part if i % 2 else _squeeze_css(part) for i, part in enumerate(parts)).strip()
+
+
+# Characters after which a "/" starts a regular expression rather than a division
+_REGEX_PREFIX = set("(,=:[!&|?{};+-*%<>~^") | {""}
+
+
+def _squeeze_js(code):
+    code = re.sub(r"\s*\n\s*", "\n", code)  # indentation, trailing blanks, blank lines
+    return re.sub(r"[^\S\n]+", " ", code)
+
+
+def minify_js(js):
+    """
+    Conservative JS minifier: drops comments, indentation and blank lines.
+
+    Line breaks are kept so automatic semicolon insertion behaves exactly as
+    before; strings, template literals and regex literals are copied verbatim.
+    """
+    parts = []  # code and literals alternate, like the re.split() result in minify_css
+    code = []
+    i, n = 0, len(js)
+    last = ""  # last significant character written
+    while i < n:
+        ch = js[i]
+        nxt = js[i + 1] if i + 1 < n else ""
+        if ch in "'\"`":
+            end = i + 1
+            while end < n and js[end] != ch:
+                end += 2 if js[end] == "\\" else 1
+            parts += ["".join(code), js[i:end + 1]]
+            code = []
+            i, last = end + 1, ch
+        elif ch == "/" and nxt == "/":
+            while i < n and js[i] != "\n":
+                i += 1
+        elif ch == "/" and nxt == "*":
+            end = js.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            code.append(" ")
+        elif ch == "/" and last in _REGEX_PREFIX:
+            end, in_class = i + 1, False
+            while end < n and (js[end] != "/" or in_class) and js[end] != "\n":
+                if js[end] == "\\":
+                    end += 1
+                elif js[end] == "[":
+                    in_class = True
+                elif js[end] == "]":
+                    in_class = False
+                end += 1
+            parts += ["".join(code), js[i:end + 1]]
+            code = []
+            i, last = end + 1, "/"
+        else:
+            code.append(ch)
+            if not ch.isspace():
+                last = ch
+            i += 1
+    parts.append("".join(code))
+
+    return "".join(part if i % 2 else _squeeze_js(part) for i, part in enumerate(parts)).strip()
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also minifies and precompresses (see above)."""
+
+    def _save(self, name, content):
+        minify = MINIFIERS.get(name[name.rfind("."):].lower()) if "." in name else None
+        if minify and ".min." not in name:
+            content.seek(0)  # the manifest storage may already have read it to hash it
+            content = ContentFile(minify(content.read().decode("utf-8")).encode("utf-8"))
+        return super()._save(name, content)
+
+    def url_converter(self, name, hashed_files, template=None):
+        convert = super().url_converter(name, hashed_files, template)
+
+        def converter(matchobj):
+            try:
+                return convert(matchobj)
+            except ValueError as exc:
+                # A stylesheet pointing at an image that isn't there: leave the reference alone
+                logger.warning("%s", exc)
+                return matchobj.group(0)
+
+        return converter
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected yet (no manifest) or the file is missing: keep the plain name
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for original, processed, was_processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                names.update(name for name in (original, processed) if name)
+            yield original, processed, was_processed
+
+        # Compress once every pass is done, so only final (not intermediate) files get siblings
+        if not dry_run:
+            for name in sorted(names):
+                self._compress(name)
+
+    def _compress(self, name):
+        if not name.lower().endswith(COMPRESSIBLE_EXTENSIONS) or not self.exists(name):
+            return
+        with self.open(name) as source:
+            data = source.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+
+        variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            if len(compressed) < len(data):
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                super()._save(name + suffix, ContentFile(compressed))
@@ -0,0 +1,187 @@
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+#                   BACKGROUND TASK QUEUE
+# ---------------------------------------------------------
+# Slow side effects are written to the Task table and executed later by
+# ``python manage.py runworker``; no external broker needed.
+#
+#   @task(max_attempts=5)
+#   def send_something(user_id): ...
+#
+#   send_something.delay(user.id)          # or enqueue(send_something, user.id)
+#
+# Arguments must be JSON-serializable (pass ids, not model instances).
+# With TASKS_EAGER = True (tests) tasks run immediately in-process instead.
+
+_registry = {}
+
+
+def task(func=None, *, max_attempts=3, backoff=10):
+    """Register a function as a background task. ``backoff`` is in seconds and doubles per retry."""
+
+    def decorate(f):
+        f.task_name = f"{f.__module__}.{f.__name__}"
+        f.max_attempts = max_attempts
+        f.backoff = backoff
+        f.delay = lambda *args, **kwargs: enqueue(f, *args, **kwargs)
+        _registry[f.task_name] = f
+        return f
+
+    return decorate(func) if func is not None else decorate
+
+
+def get_task(name):
+    return _registry[name]
+
+
+def enqueue(func, *args, run_at=None, **kwargs):
+    """Queue a registered task; returns the Task row (None in eager mode)."""
+    if getattr(settings, "TASKS_EAGER", False):
+        func(*args, **kwargs)
+        return None
+    return Task.objects.create(
+        name=func.task_name,
+        args=list(args),
+        kwargs=kwargs,
+        max_attempts=func.max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def _with_lock_retry(fn, attempts=20, delay=0.05):
+    """Run a small bookkeeping query, retrying while SQLite reports the database is locked."""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except OperationalError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(delay)
+
+
+class Worker:
+    """
+    Claims due tasks and runs them on a thread pool.
+
+    A task is claimed with a conditional UPDATE (status PENDING -> RUNNING),
+    so several workers can share the table without running anything twice.
+    Tasks stuck in RUNNING longer than ``lock_timeout`` (a crashed worker)
+    are put back in the queue.
+    """
+
+    def __init__(self, concurrency=1, poll_interval=1.0, lock_timeout=300):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+
+    def release_stale(self):
+        cutoff = timezone.now() - timedelta(seconds=self.lock_timeout)
+        return Task.objects.filter(status="RUNNING", locked_at__lt=cutoff).update(
+            status="PENDING", locked_by="", locked_at=None
+        )
+
+    def claim(self):
+        """Claim the next due task, or return None."""
+        now = timezone.now()
+        due = Task.objects.filter(status="PENDING", run_at__lte=now).order_by("run_at", "id")
+
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                task_row = due.select_for_update(skip_locked=True).first()
+                if task_row is None:
+                    return None
+                Task.objects.filter(pk=task_row.pk).update(
+                    status="RUNNING", locked_by=self.worker_id, locked_at=now, attempts=F("attempts") + 1
+                )
+        else:
+            # SQLite: no row locks, so race on an UPDATE guarded by the old status
+            for candidate_id in due.values_list("id", flat=True)[: self.concurrency * 2]:
+                claimed = _with_lock_retry(lambda: Task.objects.filter(pk=candidate_id, status="PENDING").update(
+                    status="RUNNING", locked_by=self.worker_id, locked_at=now, attempts=F("attempts") + 1
+                ))
+                if claimed:
+                    task_row = Task(pk=candidate_id)
+                    break
+            else:
+                return None
+
+        _with_lock_retry(task_row.refresh_from_db)
+        return task_row
+
+    def execute(self, task_row):
+        try:
+            func = get_task(task_row.name)
+            func(*task_row.args, **task_row.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            if task_row.attempts < task_row.max_attempts:
+                backoff = getattr(_registry.get(task_row.name), "backoff", 10)
+                retry_at = timezone.now() + timedelta(seconds=backoff * 2 ** (task_row.attempts - 1))
+                _with_lock_retry(lambda: Task.objects.filter(pk=task_row.pk).update(
+                    status="PENDING", run_at=retry_at, locked_by="", locked_at=None, last_error=error
+                ))
+                logger.warning("Task %s #%s failed (attempt %s), retrying at %s",
+                               task_row.name, task_row.pk, task_row.attempts, retry_at)
+            else:
+                _with_lock_retry(lambda: Task.objects.filter(pk=task_row.pk).update(status="FAILED", last_error=error))
+                logger.error("Task %s #%s failed permanently:\n%s", task_row.name, task_row.pk, error)
+            return False
+
+        _with_lock_retry(lambda: Task.objects.filter(pk=task_row.pk).update(status="DONE", last_error=""))
+        return True
+
+    def run_one(self):
+        """Claim and run a single task. Returns None if the queue was empty."""
+        close_old_connections()
+        try:
+            task_row = self.claim()
+            if task_row is None:
+                return None
+            return self.execute(task_row)
+        finally:
+            close_old_connections()
+
+    def _loop(self, once):
+        while not self.stop_event.is_set():
+            try:
+                result = self.run_one()
+            except DatabaseError as exc:
+                # Lock contention (SQLite) or a dropped connection: try again shortly
+                logger.warning("Worker %s could not claim a task: %s", self.worker_id, exc)
+                self.stop_event.wait(min(self.poll_interval, 0.1))
+                continue
+            if result is None:
+                if once:
+                    return
+                self.stop_event.wait(self.poll_interval)
+
+    def run(self, once=False):
+        """Process tasks until stopped (or, with ``once``, until the queue is drained)."""
+        self.release_stale()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [pool.submit(self._loop, once) for _ in range(self.concurrency)]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                self.stop_event.set()
+                raise
@@ -0,0 +1,78 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+
+from .models import Notification, Order, OrderItem, Product
+from .notifications import bulk_notify
+from .renditions import RenditionError, pregenerate
+from .taskqueue import task
+
+NOTIFICATION_MAX_LENGTH = Notification._meta.get_field("message").max_length
+
+
+# ---------------------------------------------------------
+#                   NOTIFICATION TASKS
+# ---------------------------------------------------------
+def _sale_message(items):
+    if len(items) == 1:
+        item = items[0]
+        return f"You made a sale! {item.quantity}x {item.product.name} was purchased."
+    lines = ", ".join(f"{item.quantity}x {item.product.name}" for item in items)
+    message = f"You made a sale! {sum(item.quantity for item in items)} items were purchased: {lines}."
+    if len(message) > NOTIFICATION_MAX_LENGTH:
+        message = message[: NOTIFICATION_MAX_LENGTH - 1] + "…"
+    return message
+
+
+@task(max_attempts=5)
+def notify_order_placed(order_id):
+    """Tell the customer their order went through and each seller (once) what sold."""
+    order = Order.objects.filter(pk=order_id).first()
+    if order is None:
+        return
+    items = OrderItem.objects.filter(order=order).select_related("product")
+
+    notifications = []
+    if order.user_id:
+        notifications.append(Notification(
+            recipient_id=order.user_id,
+            message=f"Order #{order.id} placed successfully! We are processing it.",
+            order=order,
+        ))
+
+    # Group by the seller id already on each product: no per-seller queries
+    lines_by_seller = defaultdict(list)
+    for item in items:
+        seller_id = item.product.created_by_id
+        # Only notify if the product has a seller and the seller is not buying their own item
+        if seller_id and seller_id != order.user_id:
+            lines_by_seller[seller_id].append(item)
+    notifications += [
+        Notification(recipient_id=seller_id, message=_sale_message(lines), order=order)
+        for seller_id, lines in lines_by_seller.items()
+    ]
+
+    bulk_notify(notifications)
+
+
+@task
+def notify_admins(message):
+    """Fan a message out to every superuser in one INSERT."""
+    admin_ids = User.objects.filter(is_superuser=True).values_list("id", flat=True)
+    bulk_notify([Notification(recipient_id=admin_id, message=message) for admin_id in admin_ids])
+
+
+# ---------------------------------------------------------
+#                   IMAGE TASKS
+# ---------------------------------------------------------
+@task
+def generate_product_renditions(product_id):
+    """Render every preset size of a product's image so first visitors don't wait for it."""
+    product = Product.objects.filter(pk=product_id).exclude(image="").first()
+    if product is None:
+        return
+    try:
+        pregenerate(product.image.name)
+    except RenditionError:
+        # Missing or unreadable upload: the rendition view will 404 for it anyway
+        pass
@@ -0,0 +1,27 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from MiniStore.fragments import render_product_card
+from MiniStore.renditions import srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def product_card(product, style="catalog"):
+    """Cached product card markup, e.g. {% product_card product "shop" %}."""
+    return render_product_card(product, style)
+
+
+@register.simple_tag
+def product_image(image, preset, lazy=True, **attrs):
+    """
+    Responsive <img> for an uploaded image, served as resized renditions:
+    {% product_image product.image "card" alt=product.name class="main-img" %}
+    """
+    src, candidates, sizes = srcset(image.name, preset)
+    attrs = {"src": src, "srcset": candidates, "sizes": sizes or None, **attrs, "decoding": "async"}
+    if lazy:
+        attrs["loading"] = "lazy"
+    return format_html("<img{}>", flatatt({key: value for key, value in attrs.items() if value is not None}))
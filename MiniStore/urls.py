@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from django.contrib.auth import views as auth_views
@@ -44,6 +45,10 @@ urlpatterns = [
     path("shop/category/<slug:category_slug>/", views.shop, name="product_list_by_category"),
     path("product/<slug:slug>/", views.product_detail, name="product_detail"),
 
+    # RESIZED PRODUCT IMAGES (must come before the DEBUG media route)
+    path(f"{settings.MEDIA_URL.lstrip('/')}r/<int:width>x<int:height>/<path:path>",
+         views.image_rendition, name="image_rendition"),
+
     # CART & CHECKOUT
     path("cart/", views.cart_detail, name="cart_detail"),
     path("cart/add/<int:product_id>/", views.cart_add, name="cart_add"),
@@ -59,4 +64,9 @@ urlpatterns = [
     path("about/", views.about, name="about"),
     path("contact/", views.contact, name="contact"),
     path("notifications/", views.notification_list, name="notifications"),
+
+    # MONITORING (Prometheus scrapes /metrics)
+    path("metrics", views.metrics, name="metrics"),
+    path("profiles/", views.request_profiles, name="request_profiles"),
+    path("profiles/<slug:profile_id>.<str:fmt>", views.request_profile_file, name="request_profile_file"),
 ]
\ No newline at end of file
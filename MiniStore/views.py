@@ -1,5 +1,9 @@
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import update_session_auth_hash
@@ -8,43 +12,59 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.contrib.auth import login
 from django.db import transaction
-from django.db.models import Count
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import constant_time_compare
 from django.utils.text import slugify
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import condition, require_POST
 from .forms import ProductForm, SellerRegistrationForm, OrderCheckoutForm, ShippingProfileForm
 
 # --- Import Models, Forms, and Decorators ---
-from .models import Product, Category, Order, OrderItem, UserProfile, Notification
+from .models import Product, Order, OrderItem, UserProfile, Notification
+from .search import search_products
+from .pagination import KeysetPaginator
+from .catalog import get_categories, get_category
+from .cart import Cart, get_cart_store
+from .database import write_transaction
+from .inventory import OutOfStockError, reserve_stock
+from .signals import order_placed
+from .tasks import generate_product_renditions, notify_admins
+from .notifications import mark_all_read
+from . import analytics, conditional, metrics as request_metrics, pagecache, profiling, renditions, rollups
 try:
     from .decorators import admin_required, seller_required
 except ImportError:
     def admin_required(function): return function
     def seller_required(function): return function
 
-CART_SESSION_KEY = "cart"
-
 # ---------------------------------------------------------
 #                   CART HELPER
 # ---------------------------------------------------------
-def _get_cart(session):
-    cart = session.get(CART_SESSION_KEY)
-    if cart is None:
-        cart = {}
-        session[CART_SESSION_KEY] = cart
-    return cart
+def _get_cart(request):
+    """Session cart, or the saved DB cart when CART_BACKEND = "database"."""
+    return get_cart_store(request)
 
 # ---------------------------------------------------------
-#                   PUBLIC VIEWS
+#                   CATALOG PAGINATION HELPER
 # ---------------------------------------------------------
-def product_list(request):
-    products_qs = Product.objects.filter(available=True).select_related("category")
-    categories = Category.objects.all()
-
-    query = request.GET.get("q")
-    if query:
-        products_qs = products_qs.filter(name__icontains=query)
+def _paginate_catalog(request, products_qs, per_page, query=None):
+    """
+    Returns (page_obj, mode). Browsing uses cursor pages when
+    CATALOG_PAGINATION is "keyset"; search results (ranked, not name-ordered)
+    and explicit ?page=N links keep the numbered Paginator.
+    """
+    use_keyset = (
+        getattr(settings, "CATALOG_PAGINATION", "offset") == "keyset"
+        and not query
+        and "page" not in request.GET
+    )
+    if use_keyset:
+        paginator = KeysetPaginator(products_qs, per_page)
+        return paginator.page(request.GET.get("cursor")), "keyset"
 
-    paginator = Paginator(products_qs, 8)
+    paginator = Paginator(products_qs, per_page)
     page_number = request.GET.get("page")
     try:
         page_obj = paginator.page(page_number)
@@ -52,80 +72,104 @@ def product_list(request):
         page_obj = paginator.page(1)
     except EmptyPage:
         page_obj = paginator.page(paginator.num_pages)
+    return page_obj, "pages"
+
+def _parse_day(value):
+    """A YYYY-MM-DD query parameter as a date, or None if missing/invalid."""
+    try:
+        return parse_date(value or "")
+    except ValueError:
+        return None
+
+# ---------------------------------------------------------
+#                   PUBLIC VIEWS
+# ---------------------------------------------------------
+@pagecache.cache_anonymous_page
+@condition(etag_func=conditional.listing_etag)
+def product_list(request):
+    pagecache.tag_page(request, "catalog")
+    products_qs = conditional.catalog_queryset().select_related("category")
+    categories = get_categories()
+
+    query = request.GET.get("q")
+    if query:
+        products_qs = search_products(products_qs, query)
+
+    page_obj, pagination_mode = _paginate_catalog(request, products_qs, 8, query)
 
     context = {
         "categories": categories,
         "category": None,
         "products": page_obj,
         "page_obj": page_obj,
+        "pagination_mode": pagination_mode,
         "query": query,
     }
-    return render(request, "MiniStore/product_list.html", context)
+    return conditional.revalidate(render(request, "MiniStore/product_list.html", context), request)
 
+@pagecache.cache_anonymous_page
+@condition(etag_func=conditional.listing_etag)
 def shop(request, category_slug=None):
+    pagecache.tag_page(request, "catalog", *([f"category:{category_slug}"] if category_slug else []))
     category = None
-    categories = Category.objects.all()
-    products_qs = Product.objects.filter(available=True).select_related("category")
+    categories = get_categories()
 
     if category_slug:
-        category = get_object_or_404(Category, slug=category_slug)
-        products_qs = products_qs.filter(category=category)
+        category = get_category(category_slug)
+        if category is None:
+            raise Http404("No Category matches the given query.")
+    products_qs = conditional.catalog_queryset(category).select_related("category")
 
     query = request.GET.get("q")
     if query:
-        products_qs = products_qs.filter(name__icontains=query)
+        products_qs = search_products(products_qs, query)
 
-    paginator = Paginator(products_qs, 12)
-    page_number = request.GET.get("page")
-    try:
-        page_obj = paginator.page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    page_obj, pagination_mode = _paginate_catalog(request, products_qs, 12, query)
 
     context = {
         "categories": categories,
         "category": category,
         "products": page_obj,
         "page_obj": page_obj,
+        "pagination_mode": pagination_mode,
         "query": query,
     }
-    return render(request, "MiniStore/shop.html", context)
+    return conditional.revalidate(render(request, "MiniStore/shop.html", context), request)
 
+@pagecache.cache_anonymous_page
+@condition(etag_func=conditional.product_etag, last_modified_func=conditional.product_last_modified)
 def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug, available=True)
-    return render(request, "MiniStore/product_detail.html", {"product": product})
+    product = get_object_or_404(Product.objects.select_related("category"), slug=slug, available=True)
+    pagecache.tag_page(request, f"product:{product.pk}", f"category:{product.category.slug}")
+    return conditional.revalidate(
+        render(request, "MiniStore/product_detail.html", {"product": product}), request
+    )
+
+def image_rendition(request, width, height, path):
+    """Resized product image from the disk cache (see renditions.py)."""
+    fmt = renditions.pick_format(request.headers.get("Accept"))
+    try:
+        target = renditions.get_rendition(path, width, height, fmt)
+    except renditions.RenditionError:
+        raise Http404("No such image rendition")
+
+    response = FileResponse(open(target, "rb"), content_type=renditions.FORMATS[fmt][1])
+    response["Cache-Control"] = "public, max-age=2592000"
+    patch_vary_headers(response, ["Accept"])
+    return response
 
 # ---------------------------------------------------------
 #                   CART & CHECKOUT
 # ---------------------------------------------------------
 
 def cart_detail(request):
-    cart = _get_cart(request.session)
-    product_ids = cart.keys()
-    products = Product.objects.filter(id__in=product_ids)
-
-    cart_items = []
-    total = 0
-    for product in products:
-        pid = str(product.id)
-        # Safety check if item exists in session but not db
-        if pid in cart:
-            quantity = cart[pid]["quantity"]
-            item_total = product.price * quantity
-            total += item_total
-            cart_items.append({
-                "product": product,
-                "quantity": quantity,
-                "price": product.price,
-                "item_total": item_total,
-            })
+    summary = Cart(_get_cart(request)).price()
 
     context = {
-        "items": cart_items, 
-        "cart_items": cart_items, 
-        "total": total,
+        "items": summary.lines, 
+        "cart_items": summary.lines, 
+        "unavailable_items": summary.unavailable,
+        "total": summary.total,
     }
     return render(request, "MiniStore/cart.html", context)
 
@@ -133,21 +177,16 @@ def cart_detail(request):
 @require_POST
 def cart_add(request, product_id):
     product = get_object_or_404(Product, id=product_id, available=True)
-    cart = _get_cart(request.session)
+    cart = _get_cart(request)
     
     try:
         quantity = int(request.POST.get("quantity", 1))
     except ValueError:
         quantity = 1
+    if quantity < 1:
+        quantity = 1
 
-    pid = str(product.id)
-
-    if pid in cart:
-        cart[pid]["quantity"] += quantity
-    else:
-        cart[pid] = {"quantity": quantity}
-
-    request.session.modified = True
+    cart.add(product.id, quantity)
     total_items = len(cart)
     
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
@@ -158,49 +197,44 @@ def cart_add(request, product_id):
 @login_required
 @require_POST
 def cart_update(request, product_id):
-    cart = _get_cart(request.session)
+    cart = _get_cart(request)
     pid = str(product_id)
     
     if pid in cart:
+        quantity = cart.quantity(pid)
         new_qty = request.POST.get('quantity')
         action = request.POST.get('action')
         
         if new_qty:
             try:
-                cart[pid]['quantity'] = int(new_qty)
+                quantity = int(new_qty)
             except ValueError:
                 pass 
         elif action == 'increase':
-            cart[pid]['quantity'] += 1
+            quantity += 1
         elif action == 'decrease':
-            cart[pid]['quantity'] -= 1
+            quantity -= 1
             
-        if cart[pid]['quantity'] < 1:
-            cart[pid]['quantity'] = 1 
-        
-        request.session.modified = True
+        if quantity < 1:
+            quantity = 1 
         
-        # Recalculate this item
-        product = get_object_or_404(Product, id=product_id)
-        new_item_total = product.price * cart[pid]['quantity']
-        
-        # Recalculate global cart total (Note: JS on frontend will update the visual "Selected Total")
-        cart_total = 0
-        total_quantity = 0
-        for key, item_data in cart.items():
-            try:
-                p = Product.objects.get(id=key)
-                cart_total += p.price * item_data['quantity']
-                total_quantity += item_data['quantity']
-            except Product.DoesNotExist:
-                continue
+        # Price the whole cart in one query (no per-item lookups), before
+        # anything is written: an unavailable product keeps its old quantity
+        summary = Cart(cart).price()
+        line = summary.line(pid)
+        if line is None:
+            raise Http404("No Product matches the given query.")
+
+        # One row (or one session key) changes, whatever the cart size
+        cart.set(pid, quantity)
+        line.quantity = quantity
 
         return JsonResponse({
             'success': True,
-            'quantity': cart[pid]['quantity'],
-            'item_total': new_item_total,
-            'cart_total': cart_total,
-            'cart_count': total_quantity
+            'quantity': quantity,
+            'item_total': line.item_total,
+            'cart_total': summary.total,
+            'cart_count': summary.count
         })
         
     return JsonResponse({'success': False}, status=400)
@@ -208,11 +242,10 @@ def cart_update(request, product_id):
 @login_required
 @require_POST
 def cart_remove(request, product_id):
-    cart = _get_cart(request.session)
+    cart = _get_cart(request)
     pid = str(product_id)
     if pid in cart:
-        del cart[pid]
-        request.session.modified = True
+        cart.remove(pid)
         
     total_items = len(cart) 
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
@@ -236,10 +269,10 @@ def proceed_to_checkout(request):
 
 @login_required
 def checkout(request):
-    cart = _get_cart(request.session)
+    cart = _get_cart(request)
     
     # 1. Get selected IDs (Support for partial checkout)
-    selected_ids = request.session.get('checkout_selected_ids', list(cart.keys()))
+    selected_ids = request.session.get('checkout_selected_ids', list(cart.quantities().keys()))
     
     # 2. Filter: Ensure items actually exist in cart
     valid_selected_ids = [pid for pid in selected_ids if pid in cart]
@@ -248,53 +281,42 @@ def checkout(request):
         messages.warning(request, "No items selected for checkout.")
         return redirect("cart_detail")
 
-    # 3. Fetch products securely
-    products_in_checkout = Product.objects.filter(id__in=valid_selected_ids)
+    # 3. Price the selection in one query (skips deleted/unavailable products)
+    summary = Cart(cart).price(valid_selected_ids)
+    cart_items = summary.lines
+    total = summary.total
 
-    cart_items = []
-    total = 0
-    
-    for product in products_in_checkout:
-        pid = str(product.id)
-        if pid in cart:
-            quantity = cart[pid]["quantity"]
-            item_total = product.price * quantity
-            total += item_total
-            
-            cart_items.append({
-                'product': product, 
-                'quantity': quantity,
-                'item_total': item_total
-            })
+    if not cart_items:
+        messages.warning(request, "The selected items are no longer available.")
+        return redirect("cart_detail")
 
     if request.method == "POST":
         form = OrderCheckoutForm(request.POST)
         if form.is_valid():
             try:
-                with transaction.atomic():
+                # BEGIN IMMEDIATE: take the write lock up front instead of failing mid-checkout
+                with write_transaction():
                     # A. Create Order
                     order = form.save(commit=False)
                     order.user = request.user
                     order.paid = True  # Assuming COD implies confirmed order
+                    order.total = total
+                    order.item_count = summary.count
                     order.save()
+
+                    # B. Take stock for every line (rolls everything back if any line is short)
+                    reserve_stock((item.product, item.quantity) for item in cart_items)
                     
-                    # B. Create Order Items & Remove from Cart
-                    for item in cart_items: 
-                        OrderItem.objects.create(
-                            order=order,
-                            product=item['product'],
-                            price=item['product'].price,
-                            quantity=item['quantity'],
-                        )
-
-                        # --- REMOVAL LOGIC ---
-                        pid = str(item['product'].id)
-                        if pid in cart:
-                            del cart[pid] # Remove ONLY checkout items from dict
-                    
-                    # --- CRITICAL FIX: FORCE SESSION UPDATE ---
-                    # Ito ang mag-a-update ng NOTIF BADGE at magbubura sa CART
-                    request.session['cart'] = cart 
+                    # C. Create Order Items (one INSERT) & notify sellers once per order
+                    order_items = OrderItem.objects.bulk_create([
+                        OrderItem(order=order, product=item.product, price=item.price, quantity=item.quantity)
+                        for item in cart_items
+                    ])
+                    order_placed.send(sender=Order, order=order, items=order_items)
+
+                    # --- REMOVAL LOGIC ---
+                    # Remove ONLY checkout items from the cart (also updates the cart badge)
+                    cart.remove(*[item.product.id for item in cart_items])
                     
                     # Clear selection cache
                     if 'checkout_selected_ids' in request.session:
@@ -304,6 +326,10 @@ def checkout(request):
                     request.session.modified = True
                     
                 return redirect("order_success", order_id=order.id)
+            except OutOfStockError as e:
+                for failure in e.failures:
+                    messages.error(request, failure.message)
+                return redirect("cart_detail")
             except Exception as e:
                 print(f"Checkout Error: {e}") 
                 messages.error(request, "An error occurred while placing the order.")
@@ -327,7 +353,11 @@ def checkout(request):
 
 @login_required
 def order_success(request, order_id):
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    # Items with their product and seller in one extra query (the receipt shows both)
+    orders = Order.objects.prefetch_related(
+        Prefetch("items", queryset=OrderItem.objects.select_related("product__created_by"))
+    )
+    order = get_object_or_404(orders, id=order_id, user=request.user)
     return render(request, "MiniStore/order_success.html", {"order": order})
 
 # ---------------------------------------------------------
@@ -417,28 +447,23 @@ def profile(request):
     # --- Load Data for Template ---
     my_orders = Order.objects.filter(user=user).order_by('-created')
     seller_products = []
-    seller_orders = []
-    seller_stats = {'products': 0, 'orders': 0, 'revenue': 0}
+    seller_sales = []
+    seller_stats = {'products': 0, 'orders': 0, 'units': 0, 'revenue': 0}
     
     if profile.role == 'SELLER':
         seller_products = Product.objects.filter(created_by=user).order_by('-created')
-        seller_orders = Order.objects.filter(items__product__in=seller_products).distinct().order_by("-created")
+        # Latest sales only; the seller dashboard pages through the full ledger
+        seller_sales = analytics.seller_sales_ledger(user).order_by(*analytics.LEDGER_ORDERING)[:20]
 
-        seller_stats['products'] = seller_products.count()
-        seller_stats['orders'] = seller_orders.count()
-        revenue = 0
-        for order in seller_orders:
-            for item in order.items.all():
-                if item.product.created_by == user:
-                    revenue += item.get_cost()
-        seller_stats['revenue'] = revenue
+        # Products, orders, units and revenue in one aggregate query
+        seller_stats = analytics.seller_stats(user)
 
     context = {
         'form': form,
         'profile': profile,
         'my_orders': my_orders,
         'seller_products': seller_products,
-        'seller_orders': seller_orders,
+        'seller_sales': seller_sales,
         'seller_stats': seller_stats,
         'is_admin': profile.role == 'ADMIN',
     }
@@ -450,8 +475,8 @@ def profile(request):
 @login_required
 @admin_required
 def approve_seller(request, user_id):
-    user_to_approve = get_object_or_404(User, pk=user_id)
-    profile = user_to_approve.profile
+    profile = get_object_or_404(UserProfile.objects.select_related("user"), user_id=user_id)
+    user_to_approve = profile.user
     
     # Update Role and Status
     profile.role = 'SELLER'
@@ -470,8 +495,8 @@ def approve_seller(request, user_id):
 @login_required
 @admin_required
 def deny_seller(request, user_id):
-    user_to_deny = get_object_or_404(User, pk=user_id)
-    profile = user_to_deny.profile
+    profile = get_object_or_404(UserProfile.objects.select_related("user"), user_id=user_id)
+    user_to_deny = profile.user
     
     # Reset to Customer defaults
     profile.role = 'CUSTOMER'
@@ -491,8 +516,8 @@ def deny_seller(request, user_id):
 @login_required
 @admin_required
 def approve_cancellation(request, user_id):
-    user_to_demote = get_object_or_404(User, pk=user_id)
-    profile = user_to_demote.profile
+    profile = get_object_or_404(UserProfile.objects.select_related("user"), user_id=user_id)
+    user_to_demote = profile.user
     
     # Revert to Customer
     profile.role = 'CUSTOMER'
@@ -521,12 +546,7 @@ def become_seller(request):
         messages.info(request, "Application submitted! Please wait for approval.")
         
         # 2. Notify Admin (Send notif to Superuser)
-        admins = User.objects.filter(is_superuser=True)
-        for admin in admins:
-            Notification.objects.create(
-                recipient=admin,
-                message=f"New Seller Application: {request.user.username} wants to join.",
-            )
+        notify_admins.delay(f"New Seller Application: {request.user.username} wants to join.")
     
     return redirect('profile')
 
@@ -541,12 +561,7 @@ def cancel_seller(request):
         messages.info(request, "Request to stop selling sent to Admin. Please wait for approval.")
         
         # Notify Admin
-        admins = User.objects.filter(is_superuser=True)
-        for admin in admins:
-            Notification.objects.create(
-                recipient=admin,
-                message=f"Cancellation Request: Seller {request.user.username} wants to stop selling.",
-            )
+        notify_admins.delay(f"Cancellation Request: Seller {request.user.username} wants to stop selling.")
             
     return redirect('profile')
 
@@ -554,41 +569,29 @@ def cancel_seller(request):
 @login_required
 @admin_required
 def admin_dashboard(request):
-    # 1. Stats (Binalik ko lahat)
-    total_products = Product.objects.count()
-    total_orders = Order.objects.count()
-    total_sellers = UserProfile.objects.filter(role='SELLER').count()
-    total_customers = UserProfile.objects.filter(role='CUSTOMER').count()
-
-    # 2. Get Users
-    all_users_qs = User.objects.select_related('profile').annotate(
-        total_order_count=Count('orders')
-    ).exclude(is_superuser=True)
-
-    # 3. Priority Sorting
-    def sort_priority(u):
-        status = u.profile.seller_status
-        if status == 'CANCELLATION_REQUESTED': return 0
-        if status == 'PENDING': return 1
-        if u.profile.role == 'SELLER': return 2
-        return 3
-
-    all_users = sorted(all_users_qs, key=sort_priority)
+    # 1. Stats: all four totals in one query
+    totals = analytics.store_totals()
+
+    # 2. Users: priority ordering and filtering happen in SQL, one page at a time
+    show = request.GET.get("show", "all")
+    if show not in analytics.USER_FILTERS:
+        show = "all"
+    users = analytics.user_directory(show)
+    page = KeysetPaginator(users, 25, ordering=("priority", "id")).page(request.GET.get("cursor"))
 
     context = {
-        'total_products': total_products, 
-        'total_orders': total_orders,
-        'total_sellers': total_sellers,
-        'total_customers': total_customers,
-        'all_users': all_users,
+        **totals,
+        'top_categories': rollups.top_categories(),
+        'all_users': page,
+        'show': show,
     }
     return render(request, "MiniStore/admin_dashboard.html", context)
 
 @login_required
 @admin_required
 def revoke_seller(request, user_id):
-    user_to_revoke = get_object_or_404(User, pk=user_id)
-    profile = user_to_revoke.profile
+    profile = get_object_or_404(UserProfile.objects.select_related("user"), user_id=user_id)
+    user_to_revoke = profile.user
     
     if profile.role == 'SELLER':
         profile.role = 'CUSTOMER'
@@ -632,11 +635,27 @@ def profile_settings(request):
 @login_required
 @seller_required
 def seller_dashboard(request):
-    products = Product.objects.filter(created_by=request.user)
-    orders = Order.objects.filter(items__product__in=products).distinct().order_by("-created")
+    products = list(Product.objects.filter(created_by=request.user).select_related("category").order_by("name"))
+
+    # Sales ledger filters: ?from=YYYY-MM-DD&to=YYYY-MM-DD&product=<id>
+    date_from = _parse_day(request.GET.get("from"))
+    date_to = _parse_day(request.GET.get("to"))
+    start = timezone.make_aware(datetime.combine(date_from, time.min)) if date_from else None
+    end = None
+    if date_to and date_to < date.max:  # there is no day after date.max: leave the range open
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    product_filter = next((p for p in products if str(p.id) == request.GET.get("product")), None)
+
+    ledger = analytics.seller_sales_ledger(request.user, start=start, end=end, product=product_filter)
+    sales = KeysetPaginator(ledger, 25, ordering=analytics.LEDGER_ORDERING).page(request.GET.get("cursor"))
+
     return render(request, "MiniStore/seller_dashboard.html", {
         "products": products,
-        "orders": orders
+        "sales": sales,
+        "stats": analytics.seller_stats(request.user, start=start, end=end),
+        "recent": rollups.seller_recent_sales(request.user),
+        "filters": {"from": date_from, "to": date_to, "product": product_filter},
+        "show_sales": any(key in request.GET for key in ("cursor", "from", "to", "product")),
     })
 
 @login_required
@@ -649,6 +668,8 @@ def product_create(request):
             if not product.slug: product.slug = slugify(product.name)
             product.created_by = request.user 
             product.save()
+            if product.image:
+                generate_product_renditions.delay(product.id)
             return redirect('seller_dashboard')
     else: form = ProductForm()
     return render(request, 'MiniStore/product_form.html', {'form': form})
@@ -660,7 +681,9 @@ def product_update(request, pk):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES, instance=product)
         if form.is_valid():
-            form.save()
+            product = form.save()
+            if "image" in form.changed_data and product.image:
+                generate_product_renditions.delay(product.id)
             return redirect('seller_dashboard')
     else: form = ProductForm(instance=product)
     return render(request, 'MiniStore/product_form.html', {'form': form})
@@ -674,17 +697,49 @@ def product_delete(request, pk):
         return redirect('seller_dashboard')
     return render(request, 'MiniStore/product_confirm_delete.html', {'product': product})
 
+@pagecache.cache_anonymous_page
 def about(request): return render(request, "MiniStore/about.html")
+@pagecache.cache_anonymous_page
 def contact(request): return render(request, "MiniStore/contact.html")
 @login_required
 def notification_list(request):
     # Get all notifications for the user
     notifications = Notification.objects.filter(recipient=request.user)
     
-    # Mark all unread notifications as read when they visit the page
-    unread_notifs = notifications.filter(is_read=False)
-    if unread_notifs.exists():
-        unread_notifs.update(is_read=True)
+    # Mark all unread notifications as read when they visit the page (resets the badge counter)
+    mark_all_read(request.user)
 
     return render(request, "MiniStore/notification_list.html", {"notifications": notifications})
 
+# ---------------------------------------------------------
+#                   MONITORING
+# ---------------------------------------------------------
+def metrics(request):
+    """Request metrics in the Prometheus text format (see metrics.py), for staff or METRICS_TOKEN."""
+    token = getattr(settings, "METRICS_TOKEN", None)
+    bearer = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not request.user.is_staff and not (token and constant_time_compare(bearer, token)):
+        raise PermissionDenied
+    response = HttpResponse(request_metrics.render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    response["Cache-Control"] = "no-store"
+    return response
+
+def _require_staff(request):
+    if not request.user.is_staff:
+        raise PermissionDenied
+
+def request_profiles(request):
+    """Recent sampled profiles (see profiling.py) with links to their flamegraph files."""
+    _require_staff(request)
+    return render(request, "MiniStore/request_profiles.html", {
+        "profiles": profiling.recent_profiles(),
+        "keep": profiling.profile_keep(),
+        "sample_rate": profiling.sample_rate(),
+    })
+
+def request_profile_file(request, profile_id, fmt):
+    _require_staff(request)
+    path = profiling.profile_file(profile_id, fmt)
+    if path is None:
+        raise Http404("No such profile")
+    return FileResponse(open(path, "rb"), as_attachment=True, content_type=profiling.FORMATS[fmt][1])